@@ -0,0 +1,259 @@
+import argparse
+import gzip
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import requests
+from urllib.parse import parse_qsl, urlencode
+from fake_services import FakeService
+from run_benchmarks import REPO_ROOT, SCRAPER, run_scraper
+CASSETTE_VERSION = 1
+REDDIT_OAUTH_URL = 'https://oauth.reddit.com'
+REDDIT_WWW_URL = 'https://www.reddit.com'
+FORWARD_REQUEST_HEADERS = ('authorization', 'apikey', 'content-type', 'accept', 'prefer', 'user-agent', 'range', 'range-unit', 'accept-profile', 'content-profile', 'x-client-info')
+RECORDED_RESPONSE_HEADERS = ('content-type', 'content-range', 'retry-after', 'x-ratelimit-remaining', 'x-ratelimit-used', 'x-ratelimit-reset')
+VOLATILE_QUERY_PARAMS = ('raw_json',)
+def request_key(method, path, query):
+    params = sorted((key, value) for key, value in parse_qsl(query, keep_blank_values=True) if key not in VOLATILE_QUERY_PARAMS)
+    return f"{method} {path}?{urlencode(params)}"
+def sanitize_body(path, body):
+    if path.endswith('/api/v1/access_token'):
+        try:
+            token = json.loads(body)
+            token['access_token'] = 'replay-token'
+            return json.dumps(token)
+        except ValueError:
+            return body
+    return body
+class RecordingProxy(FakeService):
+    def __init__(self, service, route, started):
+        super().__init__()
+        self.service = service
+        self.route = route
+        self.started = started
+        self.interactions = []
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+    def handle(self, method, path, query, body, headers):
+        upstream = self.route(path)
+        forwarded = {name: value for name, value in headers.items() if name.lower() in FORWARD_REQUEST_HEADERS}
+        offset = time.perf_counter() - self.started
+        request_started = time.perf_counter()
+        try:
+            response = self.session.request(method, upstream + path + (f"?{query}" if query else ''), headers=forwarded, data=body or None, timeout=60)
+            status, content, response_headers = response.status_code, response.content, response.headers
+        except requests.RequestException as e:
+            status, content, response_headers = 502, json.dumps({"message": str(e)}).encode('utf-8'), {'Content-Type': 'application/json'}
+        elapsed = time.perf_counter() - request_started
+        kept_headers = {name: value for name, value in response_headers.items() if name.lower() in RECORDED_RESPONSE_HEADERS}
+        with self.lock:
+            self.interactions.append({
+                'service': self.service,
+                'method': method,
+                'path': path,
+                'query': query,
+                'status': status,
+                'headers': kept_headers,
+                'body': sanitize_body(path, content.decode('utf-8', errors='replace')),
+                'offset': round(offset, 4),
+                'elapsed': round(elapsed, 4)
+            })
+        return self.service, status, content, kept_headers
+class ReplayServer(FakeService):
+    def __init__(self, service, interactions, latency='original'):
+        super().__init__()
+        self.service = service
+        self.latency = latency
+        self.exact = {}
+        self.by_path = {}
+        self.lock = threading.Lock()
+        self.misses = 0
+        self.fallbacks = 0
+        for interaction in interactions:
+            self.exact.setdefault(request_key(interaction['method'], interaction['path'], interaction['query']), []).append(interaction)
+            self.by_path.setdefault(f"{interaction['method']} {interaction['path']}", []).append(interaction)
+        self.positions = {}
+    def next_interaction(self, table, key):
+        recorded = table.get(key)
+        if not recorded:
+            return None
+        position = self.positions.get((id(table), key), 0)
+        self.positions[(id(table), key)] = position + 1
+        return recorded[min(position, len(recorded) - 1)]
+    def handle(self, method, path, query, body, headers):
+        with self.lock:
+            interaction = self.next_interaction(self.exact, request_key(method, path, query))
+            if interaction is None:
+                interaction = self.next_interaction(self.by_path, f"{method} {path}")
+                if interaction is not None:
+                    self.fallbacks += 1
+            if interaction is None:
+                self.misses += 1
+        if interaction is None:
+            return 'miss', 404, {"message": f"No recorded response for {method} {path}"}, {}
+        if self.latency == 'original' and interaction['elapsed'] > 0:
+            time.sleep(interaction['elapsed'])
+        return self.service, interaction['status'], interaction['body'].encode('utf-8'), interaction['headers']
+def write_cassette(path, header, interactions):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps(header) + '\n')
+        for interaction in sorted(interactions, key=lambda item: item['offset']):
+            f.write(json.dumps(interaction) + '\n')
+def read_cassette(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {header.get('version')}")
+        interactions = [json.loads(line) for line in f if line.strip()]
+    return header, interactions
+def record(args):
+    with open(args.payload, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    credentials = payload['credentials']
+    started = time.perf_counter()
+    reddit_oauth = credentials.get('reddit_oauth_url', REDDIT_OAUTH_URL)
+    reddit_www = credentials.get('reddit_url', REDDIT_WWW_URL)
+    reddit = RecordingProxy('reddit', lambda path: reddit_www if path.startswith('/api/v1/access_token') else reddit_oauth, started).start()
+    supabase_upstream = credentials['supabase_url'].rstrip('/')
+    supabase = RecordingProxy('supabase', lambda path: supabase_upstream, started).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix='supascraper-record-') as base_dir:
+            run_payload = dict(payload, directories=payload.get('directories') or {'base': base_dir, 'exports': os.path.join(base_dir, 'exports')})
+            run_payload['credentials'] = dict(credentials, reddit_oauth_url=reddit.url, reddit_url=reddit.url, supabase_url=supabase.url)
+            result = run_scraper(run_payload, timeout=args.timeout, stop_after=args.duration)
+    finally:
+        reddit.stop()
+        supabase.stop()
+    header = {
+        'version': CASSETTE_VERSION,
+        'recorded_at': int(time.time()),
+        'config': payload.get('config', {}),
+        'preset': payload.get('preset', {}),
+        'userId': payload.get('userId', ''),
+        'duration': args.duration,
+        'result': result
+    }
+    interactions = reddit.interactions + supabase.interactions
+    write_cassette(args.output, header, interactions)
+    print(f"Recorded {len(interactions)} requests ({result['posts']} posts, {result['status']}) to {args.output}", file=sys.stderr)
+    return 0 if result['status'] in ('complete', 'stopped') else 1
+def replay_once(cassette, scraper, latency, timeout):
+    header, interactions = cassette
+    reddit = ReplayServer('reddit', [item for item in interactions if item['service'] == 'reddit'], latency).start()
+    supabase = ReplayServer('supabase', [item for item in interactions if item['service'] == 'supabase'], latency).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix='supascraper-replay-') as base_dir:
+            payload = {
+                'config': dict(header['config'], analysis_cache_disk=False),
+                'preset': header['preset'],
+                'userId': header['userId'],
+                'directories': {'base': base_dir, 'exports': os.path.join(base_dir, 'exports')},
+                'credentials': {
+                    'client_id': 'replay',
+                    'client_secret': 'replay',
+                    'user_agent': 'supascraper-replay',
+                    'reddit_oauth_url': reddit.url,
+                    'reddit_url': reddit.url,
+                    'supabase_url': supabase.url,
+                    'supabase_key': 'replay.replay.replay'
+                }
+            }
+            result = run_scraper(payload, scraper=scraper, timeout=timeout, stop_after=header.get('duration'))
+    finally:
+        reddit.stop()
+        supabase.stop()
+    result['replay_misses'] = reddit.misses + supabase.misses
+    result['replay_fallbacks'] = reddit.fallbacks + supabase.fallbacks
+    return result
+def check_endpoint_overrides(build, scraper):
+    with open(scraper, 'r', encoding='utf-8') as f:
+        if 'reddit_oauth_url' in f.read():
+            return True
+    print(f"{build} does not support the reddit_oauth_url/reddit_url credentials; replaying it would send requests to the real Reddit API", file=sys.stderr)
+    return False
+def replay(args):
+    if not check_endpoint_overrides(args.scraper, args.scraper):
+        return 2
+    result = replay_once(read_cassette(args.cassette), args.scraper, args.latency, args.timeout)
+    print(json.dumps(result, indent=2))
+    return 0 if result['status'] in ('complete', 'stopped') else 1
+def export_scraper(ref, directory):
+    os.makedirs(directory, exist_ok=True)
+    archive = subprocess.run(['git', '-C', REPO_ROOT, 'archive', ref, 'scripts'], check=True, capture_output=True).stdout
+    subprocess.run(['tar', '-x', '-C', directory], input=archive, check=True)
+    return os.path.join(directory, 'scripts', 'scraper.py')
+def resolve_scraper(build, directory):
+    if os.path.isfile(build):
+        return os.path.abspath(build)
+    return export_scraper(build, directory)
+def summarize_runs(runs):
+    return {
+        'runs': len(runs),
+        'posts': runs[0]['posts'],
+        'posts_per_second': statistics.median(run['posts_per_second'] for run in runs),
+        'cpu_ms_per_post': statistics.median(run['cpu_ms_per_post'] or 0 for run in runs),
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+        'statuses': sorted({run['status'] for run in runs}),
+        'replay_misses': max(run['replay_misses'] for run in runs)
+    }
+def compare(args):
+    cassette = read_cassette(args.cassette)
+    with tempfile.TemporaryDirectory(prefix='supascraper-builds-') as builds_dir:
+        baseline_scraper = resolve_scraper(args.baseline, os.path.join(builds_dir, 'baseline'))
+        candidate_scraper = resolve_scraper(args.candidate, os.path.join(builds_dir, 'candidate'))
+        if not (check_endpoint_overrides(args.baseline, baseline_scraper) and check_endpoint_overrides(args.candidate, candidate_scraper)):
+            return 2
+        baseline_runs = []
+        candidate_runs = []
+        for _ in range(args.repeat):
+            baseline_runs.append(replay_once(cassette, baseline_scraper, args.latency, args.timeout))
+            candidate_runs.append(replay_once(cassette, candidate_scraper, args.latency, args.timeout))
+    baseline = summarize_runs(baseline_runs)
+    candidate = summarize_runs(candidate_runs)
+    regressions = []
+    if baseline['posts_per_second'] and candidate['posts_per_second'] < baseline['posts_per_second'] * (1 - args.threshold):
+        regressions.append(f"throughput dropped from {baseline['posts_per_second']} to {candidate['posts_per_second']} posts/sec")
+    if baseline['cpu_ms_per_post'] and candidate['cpu_ms_per_post'] > baseline['cpu_ms_per_post'] * (1 + args.threshold):
+        regressions.append(f"CPU per post rose from {baseline['cpu_ms_per_post']} to {candidate['cpu_ms_per_post']} ms")
+    if candidate['posts'] != baseline['posts']:
+        regressions.append(f"post count changed from {baseline['posts']} to {candidate['posts']}")
+    report = {'cassette': args.cassette, 'threshold': args.threshold, 'baseline': dict(baseline, build=args.baseline), 'candidate': dict(candidate, build=args.candidate), 'regressions': regressions}
+    print(json.dumps(report, indent=2))
+    for regression in regressions:
+        print(f"REGRESSION: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Record scraper runs into cassettes and replay them for deterministic performance comparisons')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help='run the scraper against the real services and record every request')
+    record_parser.add_argument('--payload', required=True, help='JSON file with the config, preset, userId and credentials the app would pass')
+    record_parser.add_argument('--output', required=True, help='cassette file to write (gzip compressed JSON lines)')
+    record_parser.add_argument('--duration', type=float, help='stop the run with SIGTERM after this many seconds')
+    record_parser.add_argument('--timeout', type=float, default=3600)
+    replay_parser = commands.add_parser('replay', help='run the scraper against a recorded cassette')
+    replay_parser.add_argument('cassette')
+    replay_parser.add_argument('--scraper', default=SCRAPER)
+    replay_parser.add_argument('--latency', choices=('original', 'zero'), default='original')
+    replay_parser.add_argument('--timeout', type=float, default=3600)
+    compare_parser = commands.add_parser('compare', help='replay a cassette against two builds and flag regressions')
+    compare_parser.add_argument('cassette')
+    compare_parser.add_argument('--baseline', required=True, help='path to a scraper.py or a git ref')
+    compare_parser.add_argument('--candidate', default=SCRAPER, help='path to a scraper.py or a git ref')
+    compare_parser.add_argument('--latency', choices=('original', 'zero'), default='zero')
+    compare_parser.add_argument('--repeat', type=int, default=3, help='replays per build, at least 3; medians are compared')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='allowed relative slowdown before a change counts as a regression')
+    compare_parser.add_argument('--timeout', type=float, default=3600)
+    args = parser.parse_args(argv)
+    if args.command == 'compare' and args.repeat < 3:
+        parser.error('compare needs --repeat 3 or more; single replays are too noisy to gate on')
+    return args
+def main(argv=None):
+    args = parse_args(argv)
+    return {'record': record, 'replay': replay, 'compare': compare}[args.command](args)
+if __name__ == '__main__':
+    sys.exit(main())
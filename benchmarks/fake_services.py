@@ -0,0 +1,281 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+TITLE_WORDS = ["python", "rust", "async", "release", "memory", "performance", "database", "tutorial", "question", "help", "update", "bug", "feature", "library", "framework", "compiler", "server", "api", "design", "review", "great", "terrible", "finally", "why", "how", "new", "old", "fast", "slow", "best"]
+BODY_WORDS = TITLE_WORDS + ["the", "a", "and", "is", "it", "this", "that", "with", "for", "not", "really", "good", "bad", "love", "hate", "think", "would", "could", "code", "project", "team", "today", "yesterday", "version"]
+COMMENT_BODIES = ["This.", "lol", "Great post, thanks!", "I disagree, this is not a good idea.", "Can you share the code?", "Same thing happened to me last week.", "[deleted]", "This is the way", "Really helpful, bookmarked.", "Terrible take honestly"]
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+def query_params(query):
+    return {key: values[-1] for key, values in parse_qs(query).items()}
+def build_corpus(subreddits, posts_per_subreddit, seed=1, now=None):
+    rng = random.Random(seed)
+    now = int(now or time.time())
+    corpus = {}
+    for subreddit in subreddits:
+        posts = []
+        for index in range(posts_per_subreddit):
+            post_id = f"{subreddit[:3].lower()}{index:06d}"
+            is_self = rng.random() < 0.7
+            body_length = rng.choice([0, 20, 60, 200]) if is_self else 0
+            if is_self and rng.random() < 0.02:
+                body_length = 5000
+            posts.append({
+                "id": post_id,
+                "name": f"t3_{post_id}",
+                "title": " ".join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(4, 14))),
+                "selftext": " ".join(rng.choice(BODY_WORDS) for _ in range(body_length)),
+                "author": rng.choice(["alice", "bob", "carol", "dave", "[deleted]", "AutoModerator"]),
+                "subreddit": subreddit,
+                "url": f"https://example.com/{post_id}",
+                "created_utc": float(now - index * 90 - rng.randint(0, 60)),
+                "score": int(rng.paretovariate(1.2)) - 1,
+                "num_comments": rng.randint(0, 60),
+                "upvote_ratio": round(rng.uniform(0.5, 1.0), 2),
+                "permalink": f"/r/{subreddit}/comments/{post_id}/benchmark_post/",
+                "link_flair_text": rng.choice([None, "Discussion", "Help"]),
+                "over_18": rng.random() < 0.05,
+                "spoiler": False,
+                "stickied": index < 2,
+                "is_self": is_self,
+                "thumbnail": "self",
+                "domain": f"self.{subreddit}",
+                "gilded": 0,
+                "archived": False,
+                "locked": False
+            })
+        corpus[subreddit] = posts
+    return corpus
+def build_comment(rng, post_id, index, depth, max_depth):
+    comment_id = f"{post_id}c{index}"
+    replies = ""
+    if depth < max_depth and rng.random() < 0.4:
+        children = [build_comment(rng, post_id, f"{index}r{i}", depth + 1, max_depth) for i in range(rng.randint(1, 3))]
+        replies = {"kind": "Listing", "data": {"after": None, "before": None, "children": children}}
+    return {"kind": "t1", "data": {
+        "id": comment_id,
+        "name": f"t1_{comment_id}",
+        "body": rng.choice(COMMENT_BODIES),
+        "author": rng.choice(["erin", "frank", "grace", "AutoModerator", "helper_bot"]),
+        "score": rng.randint(-5, 400),
+        "created_utc": float(time.time() - rng.randint(0, 86400)),
+        "stickied": False,
+        "distinguished": None,
+        "link_id": f"t3_{post_id}",
+        "parent_id": f"t3_{post_id}",
+        "replies": replies
+    }}
+class ServiceStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+    def record(self, category, status, elapsed):
+        with self.lock:
+            self.latencies.setdefault(category, []).append(elapsed)
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+    def total_requests(self, exclude=()):
+        with self.lock:
+            return sum(len(values) for category, values in self.latencies.items() if category not in exclude)
+    def summary(self):
+        with self.lock:
+            return {
+                "requests": {category: len(values) for category, values in self.latencies.items()},
+                "latency_ms": {category: {"p50": round(percentile(values, 0.5) * 1000, 2), "p99": round(percentile(values, 0.99) * 1000, 2)} for category, values in self.latencies.items()},
+                "statuses": dict(self.statuses)
+            }
+class FaultProfile:
+    def __init__(self, latency_ms=0, jitter_ms=0, page_size=100, rate_limit_rate=0.0, error_rate=0.0, seed=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.page_size = page_size
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+    def delay(self):
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        if self.latency_ms + jitter > 0:
+            time.sleep((self.latency_ms + jitter) / 1000.0)
+    def fault(self):
+        with self.lock:
+            roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    def log_message(self, format, *args):
+        pass
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+    def send_json(self, status, payload, headers=None):
+        self.send_raw(status, json.dumps(payload).encode("utf-8"), dict({"Content-Type": "application/json; charset=UTF-8"}, **(headers or {})))
+    def send_raw(self, status, body, headers):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    def dispatch(self, method):
+        started = time.perf_counter()
+        parsed = urlparse(self.path)
+        body = self.read_body()
+        category, status, payload, headers = self.server.service.handle(method, parsed.path, parsed.query, body, self.headers)
+        if isinstance(payload, bytes):
+            self.send_raw(status, payload, headers)
+        else:
+            self.send_json(status, payload, headers)
+        self.server.service.stats.record(category, status, time.perf_counter() - started)
+    def do_GET(self):
+        self.dispatch("GET")
+    def do_POST(self):
+        self.dispatch("POST")
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+class FakeService:
+    def __init__(self, profile=None):
+        self.profile = profile or FaultProfile()
+        self.stats = ServiceStats()
+        self.server = None
+        self.thread = None
+    def start(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), ServiceHandler)
+        self.server.daemon_threads = True
+        self.server.service = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+    def handle(self, method, path, query, body, headers):
+        raise NotImplementedError
+QUERY_OPERATOR = re.compile(r"\b(?:nsfw|self|subreddit|author|site|url|flair):\S+", re.IGNORECASE)
+TIMESTAMP_RANGE = re.compile(r"timestamp:(\d+)\.\.(\d+)")
+class FakeReddit(FakeService):
+    def __init__(self, corpus, profile=None, comments_per_post=20, comment_depth=2):
+        super().__init__(profile)
+        self.corpus = corpus
+        self.comments_per_post = comments_per_post
+        self.comment_depth = comment_depth
+        self.posts_by_id = {post["id"]: post for posts in corpus.values() for post in posts}
+    def rate_limit_headers(self):
+        return {"x-ratelimit-remaining": "590", "x-ratelimit-used": "10", "x-ratelimit-reset": "300"}
+    def handle(self, method, path, query, body, headers):
+        params = query_params(query)
+        if path.endswith("/api/v1/access_token"):
+            return "token", 200, {"access_token": "benchmark-token", "token_type": "bearer", "expires_in": 86400, "scope": "*"}, {}
+        self.profile.delay()
+        fault = self.profile.fault()
+        if fault == 429:
+            return "rate_limited", 429, {"message": "Too Many Requests", "error": 429}, dict(self.rate_limit_headers(), **{"Retry-After": "1"})
+        if fault == 500:
+            return "server_error", 500, {"message": "Internal Server Error", "error": 500}, {}
+        parts = [part for part in path.split("/") if part]
+        if len(parts) >= 2 and parts[0] == "comments":
+            return "comments", 200, self.comments(parts[1], params), self.rate_limit_headers()
+        if len(parts) >= 3 and parts[0] == "r":
+            posts = self.corpus.get(parts[1])
+            if posts is None:
+                return "not_found", 404, {"message": "Not Found", "error": 404}, {}
+            endpoint = parts[2]
+            return endpoint, 200, self.listing(self.select(posts, endpoint, params), params), self.rate_limit_headers()
+        return "not_found", 404, {"message": "Not Found", "error": 404}, {}
+    def select(self, posts, endpoint, params):
+        if endpoint == "search":
+            query = params.get("q", "")
+            timestamp = TIMESTAMP_RANGE.search(query)
+            if timestamp:
+                low, high = int(timestamp.group(1)), int(timestamp.group(2))
+                posts = [post for post in posts if low <= post["created_utc"] <= high]
+            terms = [term for term in re.findall(r"[a-z0-9]+", QUERY_OPERATOR.sub(" ", TIMESTAMP_RANGE.sub(" ", query)).lower()) if term not in ("title", "and", "or", "not")]
+            if terms:
+                posts = [post for post in posts if all(term in post["title"].lower() for term in terms)]
+            if "nsfw:no" in query:
+                posts = [post for post in posts if not post["over_18"]]
+            if "self:yes" in query:
+                posts = [post for post in posts if post["is_self"]]
+            elif "self:no" in query:
+                posts = [post for post in posts if not post["is_self"]]
+            sort = params.get("sort", "relevance")
+            if sort == "top":
+                posts = sorted(posts, key=lambda post: -post["score"])
+            elif sort == "comments":
+                posts = sorted(posts, key=lambda post: -post["num_comments"])
+            return posts
+        if endpoint == "top":
+            return sorted(posts, key=lambda post: -post["score"])
+        if endpoint == "hot":
+            return sorted(posts, key=lambda post: -(post["score"] + 1) / ((time.time() - post["created_utc"]) / 3600 + 2) ** 1.5)
+        return posts
+    def listing(self, posts, params):
+        page_size = min(int(params.get("limit") or 25), self.profile.page_size)
+        start = 0
+        if params.get("after"):
+            ids = [post["name"] for post in posts]
+            start = ids.index(params["after"]) + 1 if params["after"] in ids else len(posts)
+            page = posts[start:start + page_size]
+        elif params.get("before"):
+            ids = [post["name"] for post in posts]
+            end = ids.index(params["before"]) if params["before"] in ids else 0
+            page = posts[max(0, end - page_size):end]
+        else:
+            page = posts[:page_size]
+        after = page[-1]["name"] if page and posts.index(page[-1]) < len(posts) - 1 else None
+        return {"kind": "Listing", "data": {"after": after, "before": None, "dist": len(page), "children": [{"kind": "t3", "data": post} for post in page]}}
+    def comments(self, post_id, params):
+        post = self.posts_by_id.get(post_id) or {"id": post_id, "name": f"t3_{post_id}", "title": "", "selftext": "", "subreddit": "unknown", "num_comments": 0}
+        rng = random.Random(post_id)
+        limit = int(params.get("limit") or self.comments_per_post)
+        depth = int(params.get("depth") or self.comment_depth)
+        children = [build_comment(rng, post_id, index, 0, depth) for index in range(min(limit, self.comments_per_post))]
+        return [
+            {"kind": "Listing", "data": {"after": None, "before": None, "children": [{"kind": "t3", "data": post}]}},
+            {"kind": "Listing", "data": {"after": None, "before": None, "children": children}}
+        ]
+class FakeSupabase(FakeService):
+    def __init__(self, profile=None):
+        super().__init__(profile)
+        self.rows = {}
+        self.lock = threading.Lock()
+    def handle(self, method, path, query, body, headers):
+        self.profile.delay()
+        if self.profile.fault():
+            return "server_error", 500, {"message": "Internal Server Error", "code": "XX000", "details": None, "hint": None}, {}
+        parts = [part for part in path.split("/") if part]
+        if len(parts) >= 4 and parts[:3] == ["rest", "v1", "rpc"]:
+            return "rpc", 200, None, {}
+        if len(parts) < 3 or parts[:2] != ["rest", "v1"]:
+            return "not_found", 404, {"message": "Not Found"}, {}
+        table = parts[2]
+        if method == "GET":
+            return "select", 200, [], {}
+        payload = json.loads(body or b"null")
+        rows = payload if isinstance(payload, list) else [payload]
+        if method == "POST":
+            with self.lock:
+                self.rows[table] = self.rows.get(table, 0) + len(rows)
+            return "insert", 201, rows, {}
+        return "update", 200, [], {}
@@ -0,0 +1,229 @@
+import argparse
+import gc
+import gzip
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from fake_services import BODY_WORDS, COMMENT_BODIES, TITLE_WORDS
+from run_benchmarks import REPO_ROOT
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(BENCHMARK_DIR, 'data', 'microbench_corpus.json.gz')
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baselines', 'microbench.json')
+ENTITY_WORDS = ['Elon Musk', 'Tesla', 'New York City', 'Taylor Swift', 'Apple', 'Google', 'Microsoft', 'Joe Biden', 'London', 'OpenAI', 'Python Software Foundation', 'Rust Foundation']
+ENTITY_LABELS = {'Elon Musk': 'PERSON', 'Taylor Swift': 'PERSON', 'Joe Biden': 'PERSON', 'New York City': 'GPE', 'London': 'GPE'}
+EMOJI = ['😀', '🔥', '🚀', '💀', '👍', '🤔']
+def build_microbench_corpus(seed=7):
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(1000):
+        words = [rng.choice(TITLE_WORDS) for _ in range(rng.randint(3, 16))]
+        if rng.random() < 0.3:
+            words.insert(rng.randint(0, len(words)), rng.choice(ENTITY_WORDS))
+        if rng.random() < 0.1:
+            words.append(rng.choice(EMOJI))
+        title = ' '.join(words)
+        titles.append(title[0].upper() + title[1:] + rng.choice(['', '?', '!', '...', ' :)']))
+    bodies = []
+    for _ in range(200):
+        length = rng.choice([0, 0, 15, 40, 120, 400])
+        bodies.append(' '.join(rng.choice(BODY_WORDS + ENTITY_WORDS) for _ in range(length)))
+    comments = [rng.choice(COMMENT_BODIES) + ' ' + ' '.join(rng.choice(BODY_WORDS) for _ in range(rng.randint(0, 30))) for _ in range(1000)]
+    pathological = {
+        'long_titles': [' '.join(rng.choice(TITLE_WORDS) for _ in range(60)) for _ in range(50)],
+        'long_selftext': [' '.join(rng.choice(BODY_WORDS + ENTITY_WORDS) for _ in range(8000)) + '. ' * 50 for _ in range(3)],
+        'no_sentence_breaks': [' '.join(rng.choice(BODY_WORDS) for _ in range(3000)) for _ in range(3)],
+        'punctuation_heavy': [''.join(rng.choice('!?.,;:()[]*_~') for _ in range(200)) + ' good ' * 10 for _ in range(50)]
+    }
+    keywords = {
+        'single': ['python', 'memory', 'release'],
+        'multi_word': ['python release', 'rust async runtime', 'database performance tuning'],
+        'many_words': [' '.join(TITLE_WORDS), ' '.join(TITLE_WORDS[:12])],
+        'entity_phrases': ['elon musk tesla stock', 'new york city subway', 'taylor swift tour tickets', 'python software foundation grant']
+    }
+    return {'seed': seed, 'titles': titles, 'bodies': bodies, 'comments': comments, 'pathological': pathological, 'keywords': keywords}
+def write_corpus(path=CORPUS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(build_microbench_corpus(), f)
+def load_corpus(path=CORPUS_PATH):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+class Benchmark:
+    def __init__(self, name, function, cases):
+        self.name = name
+        self.function = function
+        self.cases = cases
+    def run_once(self):
+        function = self.function
+        started = time.perf_counter_ns()
+        for case in self.cases:
+            function(*case)
+        return time.perf_counter_ns() - started
+    def measure_time(self, min_time, repeat):
+        self.run_once()
+        rounds = 1
+        while True:
+            elapsed = sum(self.run_once() for _ in range(rounds))
+            if elapsed >= min_time * 1e9:
+                break
+            rounds *= 2
+        best = elapsed
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(repeat - 1):
+                best = min(best, sum(self.run_once() for _ in range(rounds)))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return best / (rounds * len(self.cases))
+    def measure_allocations(self, samples=200):
+        cases = self.cases[:samples]
+        peak_total = 0
+        tracemalloc.start()
+        try:
+            for case in cases:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                self.function(*case)
+                peak_total += tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+        return peak_total / len(cases)
+def build_stand_in_nlp():
+    import spacy
+    nlp = spacy.blank('en')
+    ruler = nlp.add_pipe('entity_ruler', config={'phrase_matcher_attr': 'LOWER'})
+    ruler.add_patterns([{'label': ENTITY_LABELS.get(word, 'ORG'), 'pattern': word} for word in ENTITY_WORDS])
+    nlp.meta['name'] = 'microbench_entity_ruler'
+    return nlp
+def scraper_benchmarks(corpus):
+    import scraper
+    from scraper import PostRecord, analyze_sentiment, apply_filters, check_keyword_match, extract_entities
+    scraper.analysis_cache = None
+    benchmarks = []
+    titles = corpus['titles']
+    keywords = corpus['keywords']
+    for group in ('single', 'multi_word', 'many_words'):
+        cases = [(title, keyword, False, False, False) for keyword in keywords[group] for title in titles[:500]]
+        benchmarks.append(Benchmark(f'check_keyword_match/{group}', check_keyword_match, cases))
+    benchmarks.append(Benchmark('check_keyword_match/long_titles', check_keyword_match, [(title, keyword, True, False, False) for keyword in keywords['many_words'] for title in corpus['pathological']['long_titles']]))
+    scraper.configure_keyword_phrase_matcher({'entity_merge_strategy': 'phrase'}, keywords['entity_phrases'] + keywords['multi_word'])
+    benchmarks.append(Benchmark('check_keyword_match/phrase_merge', check_keyword_match, [(title, keyword, False, True, True) for keyword in keywords['entity_phrases'] for title in titles[:500]]))
+    rng = random.Random(corpus['seed'])
+    posts = [PostRecord({'id': f'p{index}', 'title': title, 'num_comments': rng.randint(0, 50), 'score': rng.randint(0, 500), 'stickied': rng.random() < 0.05, 'over_18': rng.random() < 0.05, 'is_self': rng.random() < 0.7}) for index, title in enumerate(titles[:1000])]
+    filters = {'min_comments': 5, 'min_score': 10, 'exclude_stickied': True, 'exclude_over_18': True, 'post_type': 'self'}
+    benchmarks.append(Benchmark('apply_filters/all_filters', apply_filters, [(post, filters) for post in posts]))
+    benchmarks.append(Benchmark('apply_filters/no_filters', apply_filters, [(post, {}) for post in posts]))
+    benchmarks.append(Benchmark('analyze_sentiment/titles', analyze_sentiment, [(title,) for title in titles[:1000]]))
+    benchmarks.append(Benchmark('analyze_sentiment/comments', analyze_sentiment, [(comment,) for comment in corpus['comments'][:1000]]))
+    benchmarks.append(Benchmark('analyze_sentiment/long_selftext', analyze_sentiment, [(body,) for body in corpus['pathological']['long_selftext']]))
+    benchmarks.append(Benchmark('analyze_sentiment/punctuation_heavy', analyze_sentiment, [(text,) for text in corpus['pathological']['punctuation_heavy']]))
+    scraper.load_spacy_model()
+    if scraper.nlp is None:
+        scraper.nlp = build_stand_in_nlp()
+    benchmarks.append(Benchmark('extract_entities/titles', extract_entities, [(title,) for title in titles[:300]]))
+    benchmarks.append(Benchmark('extract_entities/long_selftext', extract_entities, [(body,) for body in corpus['pathological']['long_selftext'][:2]]))
+    return benchmarks, {}
+def legacy_benchmarks(corpus):
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'legacy', 'backend'))
+    try:
+        import supascraper_backend
+    except Exception as e:
+        return [], {'is_post_relevant': f'legacy backend could not be imported: {e}'}
+    titles = corpus['titles']
+    bodies = corpus['bodies']
+    keywords = corpus['keywords']
+    if not supascraper_backend.NLP_AVAILABLE:
+        try:
+            import inflect
+        except ImportError as e:
+            return [], {'is_post_relevant': f'legacy backend dependency is missing: {e}'}
+        supascraper_backend.nlp = build_stand_in_nlp()
+        supascraper_backend.inflect_engine = inflect.engine()
+        supascraper_backend.NLP_AVAILABLE = True
+    is_post_relevant = supascraper_backend.is_post_relevant
+    benchmarks = [
+        Benchmark('is_post_relevant/single', is_post_relevant, [(titles[i], bodies[i % len(bodies)], keyword) for keyword in keywords['single'] for i in range(200)]),
+        Benchmark('is_post_relevant/entity_phrases', is_post_relevant, [(titles[i], bodies[i % len(bodies)], keyword) for keyword in keywords['entity_phrases'] for i in range(150)]),
+        Benchmark('is_post_relevant/many_words', is_post_relevant, [(titles[i], bodies[i % len(bodies)], keywords['many_words'][1]) for i in range(100)]),
+        Benchmark('is_post_relevant/long_selftext', is_post_relevant, [(titles[i], body, keyword) for i, body in enumerate(corpus['pathological']['long_selftext']) for keyword in keywords['entity_phrases']]),
+        Benchmark('is_post_relevant/no_sentence_breaks', is_post_relevant, [(titles[i], body, keyword) for i, body in enumerate(corpus['pathological']['no_sentence_breaks']) for keyword in keywords['entity_phrases']])
+    ]
+    return benchmarks, {}
+def run_suite(args):
+    corpus = load_corpus(args.corpus)
+    benchmarks, skipped = scraper_benchmarks(corpus)
+    legacy, legacy_skipped = legacy_benchmarks(corpus)
+    benchmarks += legacy
+    skipped.update(legacy_skipped)
+    results = {}
+    for benchmark in benchmarks:
+        if args.filter and args.filter not in benchmark.name:
+            continue
+        ns_per_op = benchmark.measure_time(args.min_time, args.repeat)
+        peak_bytes = benchmark.measure_allocations()
+        results[benchmark.name] = {'ns_per_op': int(ns_per_op), 'peak_alloc_bytes_per_op': int(peak_bytes), 'cases': len(benchmark.cases)}
+        print(f"{benchmark.name:45s} {ns_per_op:14,.1f} ns/op {int(peak_bytes):12,d} B/op", file=sys.stderr)
+    for name, reason in skipped.items():
+        print(f"{name:45s} skipped: {reason}", file=sys.stderr)
+    import scraper
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'entity_model': scraper.nlp.meta.get('name'), 'results': results, 'skipped': skipped}
+def compare_to_baseline(report, baseline, threshold, alloc_threshold):
+    regressions = []
+    same_entity_model = report.get('entity_model') == baseline.get('entity_model')
+    if not same_entity_model:
+        print(f"extract_entities not compared: baseline used {baseline.get('entity_model')}, this run used {report.get('entity_model')}", file=sys.stderr)
+    for name, result in sorted(report['results'].items()):
+        previous = baseline.get('results', {}).get(name)
+        if not previous or (name.startswith('extract_entities/') and not same_entity_model):
+            continue
+        change = result['ns_per_op'] / previous['ns_per_op'] - 1 if previous['ns_per_op'] else 0.0
+        alloc_change = result['peak_alloc_bytes_per_op'] / previous['peak_alloc_bytes_per_op'] - 1 if previous['peak_alloc_bytes_per_op'] else 0.0
+        print(f"{name:45s} time {change:+7.1%}  alloc {alloc_change:+7.1%}", file=sys.stderr)
+        if change > threshold or alloc_change > alloc_threshold:
+            regressions.append(name)
+    return regressions
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for the per-post matching, filtering, sentiment and entity hot paths')
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this string')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per timing round')
+    parser.add_argument('--repeat', type=int, default=5, help='timing rounds; the fastest is reported')
+    parser.add_argument('--corpus', default=CORPUS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='overwrite the stored baseline with this run')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative slowdown reported as a regression')
+    parser.add_argument('--alloc-threshold', type=float, default=0.05, help='relative growth in peak bytes per op reported as a regression')
+    parser.add_argument('--write-corpus', action='store_true', help='regenerate the bundled corpus and exit')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    return parser.parse_args(argv)
+def main(argv=None):
+    args = parse_args(argv)
+    if args.write_corpus:
+        write_corpus(args.corpus)
+        return 0
+    report = run_suite(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(report, baseline, args.threshold, args.alloc_threshold)
+    for name in regressions:
+        print(f"REGRESSION: {name}", file=sys.stderr)
+    return 1 if regressions else 0
+if __name__ == '__main__':
+    sys.exit(main())
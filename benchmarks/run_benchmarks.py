@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import psutil
+from fake_services import FakeReddit, FakeSupabase, FaultProfile, build_corpus
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRAPER = os.path.join(REPO_ROOT, 'scripts', 'scraper.py')
+SUBREDDITS = ['python', 'rust', 'golang']
+KEYWORDS = 'python,performance,release,memory'
+MODES = {
+    'keyword': ({'mode': 'keyword'}, {}),
+    'local': ({'mode': 'keyword'}, {'keyword_strategy': 'local'}),
+    'deepscan': ({'mode': 'deepscan'}, {}),
+    'hybrid': ({'mode': 'hybrid'}, {}),
+    'backfill': ({'mode': 'keyword'}, {'runtime_mode': 'backfill'}),
+    'daemon': ({'mode': 'deepscan'}, {'runtime_mode': 'continuous', 'daemon_min_interval': 1, 'daemon_max_interval': 2}),
+    'comments': ({'mode': 'deepscan'}, {'scrape_comments': True, 'max_comments_per_post': 10})
+}
+class RssSampler:
+    def __init__(self, pid, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+    def sample(self):
+        try:
+            process = psutil.Process(self.pid)
+            processes = [process] + process.children(recursive=True)
+        except psutil.Error:
+            return
+        rss = 0
+        for child in processes:
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                continue
+        self.peak_rss = max(self.peak_rss, rss)
+    def run(self):
+        while not self.stop_event.is_set():
+            self.sample()
+            self.stop_event.wait(self.interval)
+    def start(self):
+        self.thread.start()
+        return self
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+def build_payload(mode, reddit_url, supabase_url, directories, args, now):
+    preset_overrides, config_overrides = MODES[mode]
+    preset = {'id': f'benchmark-{mode}', 'name': f'Benchmark {mode}', 'subreddits': SUBREDDITS, 'keywords': KEYWORDS}
+    preset.update(preset_overrides)
+    config = {
+        'rateLimit': 100000,
+        'max_posts_per_subreddit': args.posts_per_subreddit,
+        'max_posts_per_keyword': args.posts_per_subreddit,
+        'sentiment_analysis': not args.no_enrichment,
+        'entity_recognition': False,
+        'analysis_cache_disk': False,
+        'stage_timing': True,
+        'filters': {},
+        'backfill_start': now - args.posts_per_subreddit * 90,
+        'backfill_end': now
+    }
+    config.update(config_overrides)
+    config.update(args.config)
+    return {
+        'config': config,
+        'preset': preset,
+        'userId': 'benchmark-user',
+        'directories': directories,
+        'credentials': {
+            'client_id': 'benchmark',
+            'client_secret': 'benchmark',
+            'user_agent': 'supascraper-benchmark',
+            'reddit_oauth_url': reddit_url,
+            'reddit_url': reddit_url,
+            'supabase_url': supabase_url,
+            'supabase_key': 'benchmark.benchmark.benchmark'
+        }
+    }
+def run_scraper(payload, scraper=SCRAPER, timeout=600, stop_after=None):
+    env = dict(os.environ, praw_check_for_updates='False', PYTHONUNBUFFERED='1')
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, scraper, json.dumps(payload)], cwd=os.path.dirname(scraper), env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    sampler = RssSampler(process.pid).start()
+    stdout_lines = []
+    stderr_lines = []
+    startup_cpu = []
+    def read_stdout():
+        for line in process.stdout:
+            if not startup_cpu:
+                try:
+                    times = psutil.Process(process.pid).cpu_times()
+                    startup_cpu.append(times.user + times.system)
+                except psutil.Error:
+                    startup_cpu.append(0.0)
+            stdout_lines.append(line)
+    readers = [threading.Thread(target=read_stdout, daemon=True), threading.Thread(target=lambda: stderr_lines.extend(process.stderr), daemon=True)]
+    for reader in readers:
+        reader.start()
+    if stop_after:
+        threading.Timer(stop_after, process.send_signal, (signal.SIGTERM,)).start()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    for reader in readers:
+        reader.join()
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+    usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    stderr = ''.join(stderr_lines)
+    messages = []
+    for line in stdout_lines:
+        try:
+            messages.append(json.loads(line))
+        except ValueError:
+            continue
+    final = next((message for message in reversed(messages) if message.get('type') in ('complete', 'stopped', 'error')), {})
+    posts = (final.get('data') or {}).get('total_posts', 0)
+    cpu_seconds = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    startup_cpu_seconds = startup_cpu[0] if startup_cpu else 0.0
+    run_cpu_seconds = max(cpu_seconds - startup_cpu_seconds, 0.0)
+    return {
+        'status': final.get('type', 'missing'),
+        'exit_code': process.returncode,
+        'posts': posts,
+        'elapsed_seconds': round(elapsed, 3),
+        'posts_per_second': round(posts / elapsed, 2) if elapsed > 0 else 0.0,
+        'cpu_seconds': round(cpu_seconds, 3),
+        'startup_cpu_seconds': round(startup_cpu_seconds, 3),
+        'cpu_ms_per_post': round(run_cpu_seconds * 1000 / posts, 3) if posts else None,
+        'peak_rss_mb': round(sampler.peak_rss / (1024 * 1024), 1),
+        'stage_timings': (final.get('data') or {}).get('stage_timings'),
+        'complete': final.get('data'),
+        'errors': [message['data'] for message in messages if message.get('type') == 'error' or (message.get('type') == 'log' and (message.get('data') or {}).get('type') == 'error')][:20],
+        'stderr_tail': stderr.strip().splitlines()[-5:] if process.returncode else []
+    }
+def run_mode(mode, args, now):
+    corpus = build_corpus(SUBREDDITS, args.posts_per_subreddit, seed=args.seed, now=now)
+    profile = FaultProfile(args.latency_ms, args.jitter_ms, args.page_size, args.rate_limit_rate, args.error_rate, args.seed)
+    reddit = FakeReddit(corpus, profile).start()
+    supabase = FakeSupabase(FaultProfile(args.latency_ms, args.jitter_ms, seed=args.seed, error_rate=args.error_rate)).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix='supascraper-bench-') as base_dir:
+            payload = build_payload(mode, reddit.url, supabase.url, {'base': base_dir, 'exports': os.path.join(base_dir, 'exports')}, args, now)
+            result = run_scraper(payload, timeout=args.timeout, stop_after=args.daemon_seconds if mode == 'daemon' else None)
+    finally:
+        reddit.stop()
+        supabase.stop()
+    reddit_requests = reddit.stats.total_requests(exclude=('token',))
+    supabase_requests = supabase.stats.total_requests()
+    posts = result['posts']
+    return dict({'mode': mode}, **result, **{
+        'reddit_requests': reddit_requests,
+        'supabase_requests': supabase_requests,
+        'requests_per_post': round((reddit_requests + supabase_requests) / posts, 3) if posts else None,
+        'reddit': reddit.stats.summary(),
+        'supabase': supabase.stats.summary()
+    })
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run scripts/scraper.py against local fake Reddit and Supabase servers')
+    parser.add_argument('--modes', default='keyword,local,deepscan,hybrid,backfill', help=f"comma separated list of {', '.join(MODES)}")
+    parser.add_argument('--posts-per-subreddit', type=int, default=300)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=5)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of Reddit requests answered with 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--daemon-seconds', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-enrichment', action='store_true')
+    parser.add_argument('--config', type=json.loads, default={}, help='JSON object merged into the scraper config')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    return parser.parse_args(argv)
+def main(argv=None):
+    args = parse_args(argv)
+    now = int(time.time())
+    results = []
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        if mode not in MODES:
+            print(f'Unknown mode: {mode}', file=sys.stderr)
+            return 2
+        result = run_mode(mode, args, now)
+        results.append(result)
+        print(f"{mode}: {result['posts']} posts in {result['elapsed_seconds']}s ({result['posts_per_second']} posts/sec, {result['requests_per_post']} requests/post, {result['cpu_ms_per_post']} CPU ms/post, peak RSS {result['peak_rss_mb']} MB, {result['status']})", file=sys.stderr)
+    report = {
+        'generated_at': now,
+        'python': sys.version.split()[0],
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output',)},
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0 if all(result['status'] in ('complete', 'stopped') for result in results) else 1
+if __name__ == '__main__':
+    sys.exit(main())
@@ -570,7 +570,15 @@ ipcMain.on('start-scraper', (event, data) => {
 	const pythonScript = isDev 
 		? join(__dirname, '../scripts/scraper.py')
 		: join(process.resourcesPath, 'app.asar.unpacked', 'scripts', 'scraper.py')
-	scraperProcess = spawn(pythonExecutable, [pythonScript, JSON.stringify(data)])
+	const scraperData = {
+		...data,
+		directories: {
+			base: errorLogger.getBaseDirectory(),
+			logs: errorLogger.getLogDirectory(),
+			exports: errorLogger.getExportDirectory()
+		}
+	}
+	scraperProcess = spawn(pythonExecutable, [pythonScript, JSON.stringify(scraperData)])
 	scraperProcess.stdout.on('data', (data) => {
 		try {
 			const lines = data.toString().split('\n')
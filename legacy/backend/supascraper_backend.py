@@ -30,6 +30,13 @@ def initialize_nlp():
     except ImportError:
         NLP_AVAILABLE = False
 analyzer = SentimentIntensityAnalyzer()
+sentiment_engine = None
+try:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scripts"))
+    from sentiment_engine import SentimentEngine
+    sentiment_engine = SentimentEngine("vader", analyzer=analyzer)
+except Exception:
+    sentiment_engine = None
 initialize_nlp()
 reddit = None
 supabase_client = None
@@ -59,7 +66,13 @@ def log_error(message):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     send_message({"type": "error", "message": f"[{timestamp}] {message}"})
 def get_sentiment(text):
+    if sentiment_engine is not None:
+        return sentiment_engine.score(text or "")
     return analyzer.polarity_scores(text or "")["compound"]
+def get_sentiment_batch(texts):
+    if sentiment_engine is not None:
+        return sentiment_engine.score_batch([text or "" for text in texts])
+    return [get_sentiment(text) for text in texts]
 def is_post_relevant(title, body, keyword_phrase, use_spacy=True):
     if not NLP_AVAILABLE:
         initialize_nlp()
@@ -423,8 +436,7 @@ def scrape_submission(submission, search_keyword=None, matched_words=None):
             post_data["comments"].append({
                 "comment_id": comment.id if hasattr(comment, 'id') else f"comment_{comment_count}",
                 "text": comment_text,
-                "score": comment.score if hasattr(comment, 'score') else 0,
-                "sentiment": get_sentiment(comment_text)
+                "score": comment.score if hasattr(comment, 'score') else 0
             })
             comment_count += 1
         if comment_count < 5:
@@ -433,6 +445,9 @@ def scrape_submission(submission, search_keyword=None, matched_words=None):
                 "data": f"<b>Not Enough Comments (Skipped):</b> {post_data['title'][:50]}"
             })
             return "skipped"
+        comment_sentiments = get_sentiment_batch([entry["text"] for entry in post_data["comments"]])
+        for entry, sentiment in zip(post_data["comments"], comment_sentiments):
+            entry["sentiment"] = sentiment
         created_iso = datetime.fromtimestamp(post_data["created_utc"], tz=timezone.utc).isoformat()
         insert_data = {
             "post_id": post_data["post_id"],
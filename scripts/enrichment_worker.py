@@ -0,0 +1,79 @@
+import sys
+import json
+import time
+from supabase import create_client, Client
+import scraper
+from scraper import log_message, write_message, categorize_and_log_error, enrich_rows, load_spacy_model
+def fetch_pending_batch(supabase: Client, last_id, batch_size):
+    query = supabase.table('reddit_posts').select('*').eq('enrichment_status', 'pending').order('id').limit(batch_size)
+    if last_id is not None:
+        query = query.gt('id', last_id)
+    return query.execute().data or []
+def write_enriched_rows(supabase: Client, rows):
+    supabase.table('reddit_posts').upsert(rows, on_conflict='post_id').execute()
+def run_enrichment_worker(supabase: Client, config):
+    batch_size = config.get('enrichment_batch_size', 500)
+    follow = config.get('enrichment_follow', False)
+    poll_interval = config.get('enrichment_poll_interval', 30)
+    sentiment_enabled = config.get('sentiment_analysis', True)
+    entities_enabled = config.get('entity_recognition', False)
+    rows_enriched = 0
+    start_time = time.time()
+    last_id = None
+    while not scraper.stop_requested:
+        try:
+            rows = fetch_pending_batch(supabase, last_id, batch_size)
+        except Exception as e:
+            categorize_and_log_error(e, "Failed to fetch pending posts")
+            break
+        if not rows:
+            if not follow:
+                break
+            last_id = None
+            for _ in range(poll_interval):
+                if scraper.stop_requested:
+                    break
+                time.sleep(1)
+            continue
+        last_id = rows[-1]['id']
+        enrich_rows(rows, sentiment_enabled, entities_enabled)
+        try:
+            write_enriched_rows(supabase, rows)
+        except Exception as e:
+            categorize_and_log_error(e, f"Failed to write {len(rows)} enriched posts")
+            continue
+        rows_enriched += len(rows)
+        elapsed = time.time() - start_time
+        log_message("info", f"Enriched {rows_enriched} posts ({rows_enriched / max(elapsed, 0.001):.1f} posts/sec)")
+    return rows_enriched, time.time() - start_time
+def main():
+    try:
+        if len(sys.argv) < 2:
+            log_message("error", "No configuration provided")
+            sys.exit(1)
+        data = json.loads(sys.argv[1])
+        config = data.get('config', {})
+        credentials = data.get('credentials', {})
+        scraper.set_sentiment_threshold(config.get('sentiment_threshold', 0.1))
+        scraper.configure_analysis_cache(config)
+        if config.get('entity_recognition', False):
+            load_spacy_model()
+            if scraper.nlp is None:
+                log_message("error", "spaCy model en_core_web_sm is not installed - entities will be left empty")
+        supabase: Client = create_client(
+            credentials['supabase_url'],
+            credentials['supabase_key']
+        )
+        log_message("info", "Enrichment worker started")
+        rows_enriched, elapsed = run_enrichment_worker(supabase, config)
+        if scraper.analysis_cache is not None:
+            scraper.analysis_cache.close()
+        rows_per_second = rows_enriched / elapsed if elapsed > 0 else 0.0
+        log_message("info", f"Enrichment finished: {rows_enriched} posts in {int(elapsed)}s ({rows_per_second:.1f} posts/sec)")
+        write_message({"type": "complete", "data": {"total_posts": rows_enriched, "elapsed_time": int(elapsed), "rows_per_second": rows_per_second}})
+    except Exception as e:
+        log_message("error", f"Fatal error: {str(e)}")
+        write_message({"type": "error", "data": {"message": str(e)}})
+        sys.exit(1)
+if __name__ == "__main__":
+    main()
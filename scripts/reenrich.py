@@ -0,0 +1,90 @@
+import sys
+import json
+import time
+import os
+from concurrent.futures import ProcessPoolExecutor
+from supabase import create_client, Client
+import scraper
+from scraper import log_message, write_message, categorize_and_log_error, enrich_rows, load_state_file, save_state_file, load_spacy_model
+from enrichment_worker import write_enriched_rows
+def init_reenrich_process(threshold, entities_enabled):
+    scraper.set_sentiment_threshold(threshold)
+    if entities_enabled:
+        load_spacy_model()
+def reenrich_chunk(rows, sentiment_enabled, entities_enabled):
+    return enrich_rows(rows, sentiment_enabled, entities_enabled)
+def fetch_page_after(supabase: Client, cursor, batch_size):
+    query = supabase.table('reddit_posts').select('*').order('collected_at').order('id').limit(batch_size)
+    if cursor:
+        collected_at = cursor['collected_at']
+        query = query.or_(f'collected_at.gt."{collected_at}",and(collected_at.eq."{collected_at}",id.gt.{cursor["id"]})')
+    return query.execute().data or []
+def split_rows(rows, chunk_size):
+    return [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+def run_reenrichment(supabase: Client, config):
+    batch_size = config.get('reenrich_batch_size', 1000)
+    chunk_size = config.get('reenrich_chunk_size', 100)
+    workers = config.get('reenrich_workers') or os.cpu_count() or 1
+    sentiment_enabled = config.get('sentiment_analysis', True)
+    entities_enabled = config.get('entity_recognition', False)
+    threshold = config.get('sentiment_threshold', 0.1)
+    checkpoint_file = f"reenrich_{config.get('reenrich_job', 'default')}.json"
+    checkpoint = {} if config.get('reenrich_restart', False) else load_state_file(checkpoint_file, {})
+    cursor = checkpoint.get('cursor')
+    rows_done = checkpoint.get('rows', 0)
+    if cursor:
+        log_message("info", f"Resuming re-enrichment after post {cursor['id']} ({rows_done} posts already done)")
+    rows_this_run = 0
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_reenrich_process, initargs=(threshold, entities_enabled)) as pool:
+        try:
+            rows = fetch_page_after(supabase, cursor, batch_size)
+        except Exception as e:
+            categorize_and_log_error(e, "Failed to fetch posts for re-enrichment")
+            rows = []
+        while rows and not scraper.stop_requested:
+            futures = [pool.submit(reenrich_chunk, chunk, sentiment_enabled, entities_enabled) for chunk in split_rows(rows, chunk_size)]
+            next_cursor = {'collected_at': rows[-1]['collected_at'], 'id': rows[-1]['id']}
+            try:
+                next_rows = fetch_page_after(supabase, next_cursor, batch_size)
+            except Exception as e:
+                categorize_and_log_error(e, "Failed to fetch posts for re-enrichment")
+                next_rows = []
+            enriched = [row for future in futures for row in future.result()]
+            try:
+                write_enriched_rows(supabase, enriched)
+            except Exception as e:
+                categorize_and_log_error(e, f"Failed to write {len(enriched)} re-enriched posts")
+                break
+            cursor = next_cursor
+            rows_done += len(enriched)
+            rows_this_run += len(enriched)
+            save_state_file(checkpoint_file, {'cursor': cursor, 'rows': rows_done})
+            elapsed = time.time() - start_time
+            log_message("info", f"Re-enriched {rows_done} posts ({rows_this_run / max(elapsed, 0.001):.1f} posts/sec)")
+            rows = next_rows
+    return rows_this_run, time.time() - start_time
+def main():
+    try:
+        if len(sys.argv) < 2:
+            log_message("error", "No configuration provided")
+            sys.exit(1)
+        data = json.loads(sys.argv[1])
+        config = data.get('config', {})
+        credentials = data.get('credentials', {})
+        scraper.data_directories.update(data.get('directories') or {})
+        supabase: Client = create_client(
+            credentials['supabase_url'],
+            credentials['supabase_key']
+        )
+        log_message("info", "Re-enrichment job started")
+        rows_enriched, elapsed = run_reenrichment(supabase, config)
+        rows_per_second = rows_enriched / elapsed if elapsed > 0 else 0.0
+        log_message("info", f"Re-enrichment finished: {rows_enriched} posts in {int(elapsed)}s ({rows_per_second:.1f} posts/sec)")
+        write_message({"type": "complete", "data": {"total_posts": rows_enriched, "elapsed_time": int(elapsed), "rows_per_second": rows_per_second}})
+    except Exception as e:
+        log_message("error", f"Fatal error: {str(e)}")
+        write_message({"type": "error", "data": {"message": str(e)}})
+        sys.exit(1)
+if __name__ == "__main__":
+    main()
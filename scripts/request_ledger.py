@@ -0,0 +1,207 @@
+import os
+import re
+import sys
+import json
+import glob
+import queue
+import sqlite3
+import argparse
+import threading
+import contextlib
+import time
+from urllib.parse import urlsplit
+work_item = threading.local()
+ENDPOINT_PATTERNS = [
+    (re.compile(r"^/r/[^/]+/"), "/r/{subreddit}/"),
+    (re.compile(r"^/comments/[^/]+"), "/comments/{id}"),
+    (re.compile(r"^/(user|u)/[^/]+"), "/user/{name}")
+]
+SUBREDDIT_PATH = re.compile(r"^/r/([^/]+)/")
+GROUP_COLUMNS = {"subreddit": "subreddit", "keyword": "keyword", "endpoint": "service || ' ' || method || ' ' || endpoint"}
+@contextlib.contextmanager
+def ledger_work_item(subreddit=None, keyword=None):
+    previous = getattr(work_item, "value", None)
+    work_item.value = (subreddit, keyword or None)
+    try:
+        yield
+    finally:
+        work_item.value = previous
+def normalize_endpoint(path):
+    for pattern, replacement in ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path, count=1)
+    return path
+def header_number(headers, name):
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+class RequestLedger:
+    def __init__(self, path, batch_size=200, flush_interval=1.0, on_error=None):
+        self.path = path
+        self.on_error = on_error
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.ready = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="request-ledger", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+    def run(self):
+        try:
+            db = sqlite3.connect(self.path)
+            db.execute("CREATE TABLE IF NOT EXISTS requests (started_at REAL, service TEXT, method TEXT, endpoint TEXT, path TEXT, subreddit TEXT, keyword TEXT, status INTEGER, latency_ms REAL, bytes INTEGER, ratelimit_remaining REAL, ratelimit_used REAL, ratelimit_reset REAL, error TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS run (key TEXT PRIMARY KEY, value TEXT)")
+            db.commit()
+        except sqlite3.Error as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        rows = []
+        meta = {}
+        last_flush = time.time()
+        running = True
+        while running:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                running = False
+            elif item and item[0] == "meta":
+                meta.update(item[1])
+            elif item:
+                rows.append(item)
+            if rows or meta:
+                if not running or len(rows) >= self.batch_size or time.time() - last_flush >= self.flush_interval:
+                    try:
+                        with db:
+                            db.executemany("INSERT INTO requests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                            db.executemany("INSERT OR REPLACE INTO run (key, value) VALUES (?, ?)", [(key, json.dumps(value)) for key, value in meta.items()])
+                    except sqlite3.Error as e:
+                        if self.on_error is not None:
+                            self.on_error(f"Request ledger write failed: {str(e)}")
+                    rows = []
+                    meta = {}
+                    last_flush = time.time()
+        db.close()
+    def set_meta(self, **values):
+        self.queue.put(("meta", values))
+    def record(self, service, method, url, status, latency, size, headers, error=None):
+        path = urlsplit(url).path
+        subreddit, keyword = getattr(work_item, "value", None) or (None, None)
+        if subreddit is None:
+            match = SUBREDDIT_PATH.match(path)
+            subreddit = match.group(1) if match else None
+        with self.lock:
+            self.requests += 1
+            if status == 429:
+                self.rate_limited += 1
+            if status is None or status >= 500:
+                self.errors += 1
+        self.queue.put((time.time() - latency, service, method, normalize_endpoint(path), path, subreddit, keyword, status, round(latency * 1000, 3), size, header_number(headers, "x-ratelimit-remaining"), header_number(headers, "x-ratelimit-used"), header_number(headers, "x-ratelimit-reset"), error))
+    def totals(self):
+        with self.lock:
+            return {"requests": self.requests, "rate_limited": self.rate_limited, "errors": self.errors}
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+def instrument_session(session, service, ledger):
+    send = session.send
+    def ledger_send(request, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = send(request, *args, **kwargs)
+        except Exception as e:
+            ledger.record(service, request.method, str(request.url), None, time.perf_counter() - started, None, {}, type(e).__name__)
+            raise
+        if kwargs.get("stream"):
+            size = header_number(response.headers, "content-length")
+        else:
+            size = len(response.content)
+        ledger.record(service, request.method, str(request.url), response.status_code, time.perf_counter() - started, size, response.headers)
+        return response
+    session.send = ledger_send
+    return session
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+def summarize(paths, group_by):
+    column = GROUP_COLUMNS[group_by]
+    groups = {}
+    for path in paths:
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            query = f"SELECT {column}, service, method, endpoint, status, latency_ms, bytes FROM requests"
+            for group, service, method, endpoint, status, latency_ms, size in db.execute(query):
+                entry = groups.setdefault(group, {"requests": 0, "reddit_requests": 0, "posts_saved": 0, "rate_limited": 0, "errors": 0, "bytes": 0, "latencies": []})
+                entry["requests"] += 1
+                if service == "reddit":
+                    entry["reddit_requests"] += 1
+                elif method == "POST" and endpoint == "/rest/v1/reddit_posts" and status is not None and status < 300:
+                    entry["posts_saved"] += 1
+                if status == 429:
+                    entry["rate_limited"] += 1
+                if status is None or status >= 500:
+                    entry["errors"] += 1
+                entry["bytes"] += size or 0
+                entry["latencies"].append(latency_ms)
+        finally:
+            db.close()
+    summary = []
+    for group, entry in sorted(groups.items(), key=lambda item: -item[1]["requests"]):
+        latencies = entry.pop("latencies")
+        entry.update({
+            group_by: group,
+            "reddit_requests_per_post": round(entry["reddit_requests"] / entry["posts_saved"], 3) if entry["posts_saved"] else None,
+            "latency_p50_ms": percentile(latencies, 0.5),
+            "latency_p95_ms": percentile(latencies, 0.95),
+            "latency_total_s": round(sum(latencies) / 1000, 3)
+        })
+        summary.append(entry)
+    return summary
+def read_meta(path):
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return {key: json.loads(value) for key, value in db.execute("SELECT key, value FROM run")}
+    finally:
+        db.close()
+def main():
+    parser = argparse.ArgumentParser(description="Summarize scraper request ledgers by subreddit, keyword or endpoint")
+    parser.add_argument("ledgers", nargs="*", help="ledger files to summarize (default: the most recent run)")
+    parser.add_argument("--by", default="subreddit,keyword,endpoint", help="comma separated groupings: subreddit, keyword, endpoint")
+    parser.add_argument("--base-dir", help="app data directory that holds 'Scraper State'")
+    parser.add_argument("--last", type=int, default=1, help="summarize the N most recent runs when no ledger is given")
+    args = parser.parse_args()
+    paths = args.ledgers
+    if not paths:
+        import scraper
+        if args.base_dir:
+            scraper.data_directories['base'] = args.base_dir
+        paths = sorted(glob.glob(os.path.join(scraper.get_state_directory(), "request_ledgers", "*.sqlite3")), key=os.path.getmtime)[-args.last:]
+    if not paths:
+        print(json.dumps({"error": "No request ledgers found"}))
+        return 1
+    groupings = [name.strip() for name in args.by.split(",") if name.strip()]
+    unknown = [name for name in groupings if name not in GROUP_COLUMNS]
+    if unknown:
+        print(json.dumps({"error": f"Unknown grouping: {', '.join(unknown)}"}))
+        return 1
+    report = {"ledgers": [{"path": path, "run": read_meta(path)} for path in paths]}
+    for name in groupings:
+        report[f"by_{name}"] = summarize(paths, name)
+    print(json.dumps(report, indent=2))
+    return 0
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,13 +5,48 @@ import time
 import psutil
 import os
 import signal
-from datetime import datetime
-from textblob import TextBlob
+import threading
+import heapq
+import hashlib
+import re
+import random
+import sqlite3
+import multiprocessing
+import bisect
+import contextlib
+import cProfile
+import traceback
+import tracemalloc
+import glob
+import uuid
+from array import array
+from datetime import datetime, timezone
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 import spacy
+from spacy.matcher import PhraseMatcher
+from spacy.util import filter_spans
 from supabase import create_client, Client
+from praw.models import MoreComments
 from prawcore.exceptions import ResponseException, RequestException, Forbidden
+from sentiment_engine import SentimentEngine
+from request_ledger import RequestLedger, instrument_session, ledger_work_item
 nlp = None
+sentiment_engine = None
+analysis_cache = None
+SENTIMENT_CACHE_KIND = "sentiment:textblob"
+keyword_phrase_matcher = None
+stage_timer = None
+active_pipeline = None
+active_rate_limiter = None
+api_ledger = None
+run_counters = {"posts_fetched": 0, "rejections": {}}
+previous_memory_snapshot = None
+sentiment_threshold = 0.1
 stop_requested = False
+data_directories = {}
+output_lock = threading.RLock()
 def signal_handler(sig, frame):
     global stop_requested
     stop_requested = True
@@ -23,21 +58,51 @@ class RateLimiter:
         self.requests_per_minute = requests_per_minute
         self.min_interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0
         self.last_request_time = 0
+        self.lock = threading.Lock()
     def wait_if_needed(self):
         if self.min_interval <= 0:
             return
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_interval:
-            sleep_time = self.min_interval - time_since_last
+        with self.lock:
+            current_time = time.time()
+            scheduled_time = max(current_time, self.last_request_time + self.min_interval)
+            self.last_request_time = scheduled_time
+        sleep_time = scheduled_time - current_time
+        if sleep_time > 0:
+            record_stage("rate_limit_wait", sleep_time)
             time.sleep(sleep_time)
-        self.last_request_time = time.time()
 def load_spacy_model():
     global nlp
     try:
         nlp = spacy.load("en_core_web_sm")
     except OSError:
         nlp = None
+def write_message(message):
+    line = json.dumps(message)
+    with output_lock:
+        print(line, flush=True)
+def get_state_directory():
+    base_dir = data_directories.get('base') or os.path.join(os.path.expanduser('~'), 'Documents', 'SupaScrapeR')
+    state_dir = os.path.join(base_dir, 'Scraper State')
+    os.makedirs(state_dir, exist_ok=True)
+    return state_dir
+def get_exports_directory():
+    base_dir = data_directories.get('base') or os.path.join(os.path.expanduser('~'), 'Documents', 'SupaScrapeR')
+    exports_dir = data_directories.get('exports') or os.path.join(base_dir, 'Exported Posts')
+    os.makedirs(exports_dir, exist_ok=True)
+    return exports_dir
+def load_state_file(filename, default):
+    path = os.path.join(get_state_directory(), filename)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+def save_state_file(filename, state):
+    path = os.path.join(get_state_directory(), filename)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
 def log_message(msg_type, message, post_id=None, reason=None):
     timestamp = datetime.now().strftime("%H:%M:%S")
     log_entry = {
@@ -49,13 +114,16 @@ def log_message(msg_type, message, post_id=None, reason=None):
         log_entry["post_id"] = post_id
     if reason:
         log_entry["reason"] = reason
-    print(json.dumps({"type": "log", "data": log_entry}), flush=True)
+    if msg_type == "rejected":
+        reason_key = (reason or "Other").split(":")[0].split(" (")[0]
+        run_counters["rejections"][reason_key] = run_counters["rejections"].get(reason_key, 0) + 1
+    write_message({"type": "log", "data": log_entry})
 def send_rate_limit_warning(wait_time):
     warning_data = {
         "wait_time": wait_time,
         "message": f"Reddit API rate limit reached. Pausing for {wait_time} seconds..."
     }
-    print(json.dumps({"type": "rate_limit", "data": warning_data}), flush=True)
+    write_message({"type": "rate_limit", "data": warning_data})
 def send_progress(status, current_target, posts_collected, total_target, cpu_usage, ram_usage, elapsed_time, current_keyword, total_keywords, current_subreddit, total_subreddits, current_iteration_posts, max_iteration_posts, mode):
     progress_data = {
         "status": status,
@@ -73,121 +141,564 @@ def send_progress(status, current_target, posts_collected, total_target, cpu_usa
         "max_iteration_posts": max_iteration_posts,
         "mode": mode
     }
-    print(json.dumps({"type": "progress", "data": progress_data}), flush=True)
+    write_message({"type": "progress", "data": progress_data})
+    if stage_timer is not None:
+        stage_timer.emit_if_due()
 def get_system_metrics():
     cpu_percent = psutil.cpu_percent(interval=0.1)
     memory = psutil.virtual_memory()
     ram_percent = memory.percent
     return cpu_percent, ram_percent
-def analyze_sentiment(text):
-    try:
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity
-        if polarity > 0.1:
-            return polarity, "positive"
-        elif polarity < -0.1:
-            return polarity, "negative"
+STAGE_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+NULL_STAGE = contextlib.nullcontext()
+class StageTimer:
+    def __init__(self, interval=10):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.last_emit = time.time()
+    def record(self, stage, seconds):
+        elapsed_ms = seconds * 1000
+        bucket = bisect.bisect_left(STAGE_BUCKETS_MS, elapsed_ms)
+        with self.lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = [0, 0.0, 0.0, [0] * (len(STAGE_BUCKETS_MS) + 1)]
+            entry[0] += 1
+            entry[1] += elapsed_ms
+            entry[2] = max(entry[2], elapsed_ms)
+            entry[3][bucket] += 1
+    def export(self, reset=False):
+        with self.lock:
+            exported = {stage: [entry[0], entry[1], entry[2], list(entry[3])] for stage, entry in self.stages.items()}
+            if reset:
+                self.stages = {}
+        return exported
+    def merge(self, exported):
+        with self.lock:
+            for stage, (count, total_ms, max_ms, buckets) in exported.items():
+                entry = self.stages.get(stage)
+                if entry is None:
+                    entry = self.stages[stage] = [0, 0.0, 0.0, [0] * (len(STAGE_BUCKETS_MS) + 1)]
+                entry[0] += count
+                entry[1] += total_ms
+                entry[2] = max(entry[2], max_ms)
+                entry[3] = [a + b for a, b in zip(entry[3], buckets)]
+    def percentile(self, entry, fraction):
+        target = entry[0] * fraction
+        seen = 0
+        for index, count in enumerate(entry[3]):
+            seen += count
+            if seen >= target and count:
+                return min(STAGE_BUCKETS_MS[index], round(entry[2], 3)) if index < len(STAGE_BUCKETS_MS) else round(entry[2], 3)
+        return round(entry[2], 3)
+    def summary(self):
+        stages = self.export()
+        return {stage: {
+            "count": entry[0],
+            "total_ms": round(entry[1], 1),
+            "mean_ms": round(entry[1] / entry[0], 3) if entry[0] else 0.0,
+            "p50_ms": self.percentile(entry, 0.5),
+            "p95_ms": self.percentile(entry, 0.95),
+            "p99_ms": self.percentile(entry, 0.99),
+            "max_ms": round(entry[2], 3)
+        } for stage, entry in sorted(stages.items(), key=lambda item: -item[1][1])}
+    def emit_if_due(self):
+        now = time.time()
+        if now - self.last_emit < self.interval:
+            return
+        self.last_emit = now
+        write_message({"type": "stage_stats", "data": {"stages": self.summary()}})
+class StageSpan:
+    __slots__ = ("timer", "stage", "started")
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timer.record(self.stage, time.perf_counter() - self.started)
+        return False
+def timed_stage(stage):
+    if stage_timer is None:
+        return NULL_STAGE
+    return StageSpan(stage_timer, stage)
+def record_stage(stage, seconds):
+    if stage_timer is not None:
+        stage_timer.record(stage, seconds)
+def configure_stage_timer(config):
+    global stage_timer
+    stage_timer = StageTimer(config.get('stage_stats_interval', 10)) if config.get('stage_timing', False) else None
+    return stage_timer
+class AnalysisCache:
+    def __init__(self, max_entries=50000, disk_path=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pending_writes = 0
+        self.db = None
+        if disk_path:
+            try:
+                self.db = sqlite3.connect(disk_path, check_same_thread=False)
+                self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            except sqlite3.Error as e:
+                log_message("error", f"Analysis cache disk tier unavailable: {str(e)}")
+                self.db = None
+    def key_for(self, kind, text):
+        return hashlib.blake2b(f"{kind}\0{text}".encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+    def get(self, kind, text):
+        key = self.key_for(kind, text)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, self.entries[key]
+            if self.db is not None:
+                row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self.remember(key, value)
+                    self.disk_hits += 1
+                    return True, value
+            self.misses += 1
+            return False, None
+    def put(self, kind, text, value):
+        key = self.key_for(kind, text)
+        with self.lock:
+            self.remember(key, value)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+                self.pending_writes += 1
+                if self.pending_writes >= 500:
+                    self.db.commit()
+                    self.pending_writes = 0
+    def remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+    def record_hits(self, count):
+        with self.lock:
+            self.hits += count
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self.entries)}
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.commit()
+                self.db.close()
+                self.db = None
+class ChunkAnalysisCache:
+    def __init__(self, known):
+        self.known = known
+        self.computed = {}
+    def get(self, kind, text):
+        if (kind, text) in self.known:
+            return True, self.known[(kind, text)]
+        return False, None
+    def put(self, kind, text, value):
+        self.computed[(kind, text)] = value
+    def record_hits(self, count):
+        pass
+def configure_analysis_cache(config):
+    global analysis_cache
+    max_entries = config.get('analysis_cache_size', 50000)
+    if not max_entries:
+        analysis_cache = None
+        return None
+    disk_path = os.path.join(get_state_directory(), 'analysis_cache.sqlite3') if config.get('analysis_cache_disk', False) else None
+    analysis_cache = AnalysisCache(max_entries, disk_path)
+    return analysis_cache
+def cached_batch(kind, texts, compute_batch):
+    if analysis_cache is None:
+        return compute_batch(texts)
+    results = [None] * len(texts)
+    missing = {}
+    for index, text in enumerate(texts):
+        if text in missing:
+            missing[text].append(index)
+            continue
+        found, value = analysis_cache.get(kind, text)
+        if found:
+            results[index] = value
         else:
-            return polarity, "neutral"
-    except:
-        return 0.0, "neutral"
+            missing[text] = [index]
+    if missing:
+        for text, value in zip(missing, compute_batch(list(missing))):
+            analysis_cache.put(kind, text, value)
+            analysis_cache.record_hits(len(missing[text]) - 1)
+            for index in missing[text]:
+                results[index] = value
+    return results
+def entity_cache_kind():
+    meta = getattr(nlp, 'meta', None) or {}
+    return f"entities:{meta.get('name', '')}:{meta.get('version', '')}"
+def set_sentiment_threshold(threshold):
+    global sentiment_threshold
+    sentiment_threshold = float(threshold)
+def get_sentiment_engine():
+    global sentiment_engine
+    if sentiment_engine is None:
+        sentiment_engine = SentimentEngine("textblob")
+    return sentiment_engine
+def label_sentiment(polarity):
+    if polarity > sentiment_threshold:
+        return polarity, "positive"
+    elif polarity < -sentiment_threshold:
+        return polarity, "negative"
+    else:
+        return polarity, "neutral"
+def analyze_sentiment(text):
+    with timed_stage("sentiment"):
+        try:
+            return label_sentiment(cached_batch(SENTIMENT_CACHE_KIND, [text], get_sentiment_engine().score_batch)[0])
+        except:
+            return 0.0, "neutral"
+def compute_entities_batch(texts, batch_size=64):
+    results = []
+    for doc in nlp.pipe(texts, batch_size=batch_size):
+        results.append([{"text": ent.text, "label": ent.label_} for ent in doc.ents if ent.label_ in ["PERSON", "ORG", "GPE", "PRODUCT"]])
+    return results
 def extract_entities(text):
     global nlp
     if nlp is None:
         return []
-    try:
-        doc = nlp(text[:10000])
-        entities = []
-        for ent in doc.ents:
-            if ent.label_ in ["PERSON", "ORG", "GPE", "PRODUCT"]:
-                entities.append({
-                    "text": ent.text,
-                    "label": ent.label_
-                })
-        return entities
-    except:
-        return []
-def scrape_comments(post, max_comments=5, enable_sentiment=True):
-    comments_data = []
-    try:
-        post.comments.replace_more(limit=0)
-        bot_keywords = ['bot', 'moderator', 'automod', 'automoderator']
-        for comment in post.comments.list()[:max_comments * 3]:
-            if len(comments_data) >= max_comments:
-                break
-            if comment.author is None:
-                continue
-            author_name = str(comment.author).lower()
-            if any(keyword in author_name for keyword in bot_keywords):
-                continue
-            if comment.stickied or comment.distinguished:
-                continue
-            comment_sentiment_score = 0.0
-            comment_sentiment_label = "neutral"
+    with timed_stage("ner"):
+        try:
+            return cached_batch(entity_cache_kind(), [text[:10000]], compute_entities_batch)[0]
+        except:
+            return []
+def is_bot_comment(comment):
+    if comment.author is None:
+        return True
+    author_name = str(comment.author).lower()
+    if any(keyword in author_name for keyword in ['bot', 'moderator', 'automod', 'automoderator']):
+        return True
+    return bool(comment.stickied or comment.distinguished)
+def select_top_comments(comment_forest, max_comments):
+    top_comments = []
+    sequence = 0
+    stack = list(comment_forest)[::-1]
+    while stack:
+        comment = stack.pop()
+        if isinstance(comment, MoreComments):
+            continue
+        replies = getattr(comment, 'replies', None)
+        if replies:
+            stack.extend(list(replies)[::-1])
+        if is_bot_comment(comment):
+            continue
+        sequence += 1
+        entry = (comment.score, -sequence, comment)
+        if len(top_comments) < max_comments:
+            heapq.heappush(top_comments, entry)
+        elif entry[:2] > top_comments[0][:2]:
+            heapq.heapreplace(top_comments, entry)
+    return [entry[2] for entry in sorted(top_comments, key=lambda entry: entry[:2], reverse=True)]
+def extract_entities_batch(texts, batch_size=64):
+    global nlp
+    if nlp is None:
+        return [[] for _ in texts]
+    with timed_stage("ner"):
+        try:
+            return cached_batch(entity_cache_kind(), [text[:10000] for text in texts], lambda batch: compute_entities_batch(batch, batch_size))
+        except:
+            return [extract_entities(text) for text in texts]
+def analyze_sentiment_batch(texts):
+    with timed_stage("sentiment"):
+        try:
+            return [label_sentiment(polarity) for polarity in cached_batch(SENTIMENT_CACHE_KIND, texts, get_sentiment_engine().score_batch)]
+        except:
+            return [analyze_sentiment(text) for text in texts]
+def analysis_keys(rows, sentiment_enabled, entities_enabled):
+    texts = [(row.get('title') or '') + " " + (row.get('body') or '') for row in rows]
+    keys = []
+    if sentiment_enabled:
+        keys.extend((SENTIMENT_CACHE_KIND, text) for text in texts)
+        keys.extend((SENTIMENT_CACHE_KIND, comment.get('body') or '') for row in rows for comment in (row.get('comments') or []))
+    if entities_enabled and nlp is not None:
+        kind = entity_cache_kind()
+        keys.extend((kind, text[:10000]) for text in texts)
+    return keys
+def lookup_analysis_cache(rows, sentiment_enabled, entities_enabled):
+    known = {}
+    for kind, text in dict.fromkeys(analysis_keys(rows, sentiment_enabled, entities_enabled)):
+        found, value = analysis_cache.get(kind, text)
+        if found:
+            known[(kind, text)] = value
+    return known
+def enrich_rows(rows, sentiment_enabled, entities_enabled):
+    texts = [(row.get('title') or '') + " " + (row.get('body') or '') for row in rows]
+    if sentiment_enabled:
+        for row, (sentiment_score, sentiment_label) in zip(rows, analyze_sentiment_batch(texts)):
+            row['sentiment_score'] = sentiment_score
+            row['sentiment_label'] = sentiment_label
+        comments = [comment for row in rows for comment in (row.get('comments') or [])]
+        comment_sentiments = analyze_sentiment_batch([comment.get('body') or '' for comment in comments])
+        for comment, (sentiment_score, sentiment_label) in zip(comments, comment_sentiments):
+            comment['sentiment_score'] = sentiment_score
+            comment['sentiment_label'] = sentiment_label
+    if entities_enabled:
+        for row, entities in zip(rows, extract_entities_batch(texts)):
+            row['entities'] = entities
+    for row in rows:
+        if 'enrichment_status' in row:
+            row['enrichment_status'] = 'complete'
+    return rows
+def scrape_comments(post, max_comments=5, enable_sentiment=True, comment_depth=2):
+    with timed_stage("comments"):
+        comments_data = []
+        try:
+            post.comment_sort = "top"
+            post.comment_limit = max_comments * 3
+            post.add_fetch_param("depth", comment_depth)
+            comments = select_top_comments(post.comments, max_comments)
             if enable_sentiment:
-                comment_sentiment_score, comment_sentiment_label = analyze_sentiment(comment.body)
-            comments_data.append({
-                "author": str(comment.author),
-                "body": comment.body,
-                "score": comment.score,
-                "created_utc": datetime.fromtimestamp(comment.created_utc).isoformat(),
-                "sentiment_score": comment_sentiment_score,
-                "sentiment_label": comment_sentiment_label
-            })
-    except Exception as e:
-        log_message("error", f"Failed to scrape comments: {str(e)}")
-    return comments_data
-def check_keyword_match(title, keyword, strict_mode, count_entities, entity_recognition_enabled):
-    title_lower = title.lower()
-    keyword_lower = keyword.strip().lower()
-    keyword_words = [w.strip() for w in keyword_lower.split() if w.strip()]
-    matched_keywords = set()
-    for word in keyword_words:
-        if word in title_lower:
-            matched_keywords.add(word)
-    entity_merge_info = []
-    if count_entities and entity_recognition_enabled:
-        detected_entities = extract_entities(title)
-        for entity in detected_entities:
-            entity_text = entity.get('text', '').lower()
-            keywords_in_entity = [kw for kw in matched_keywords if kw in entity_text]
-            if len(keywords_in_entity) >= 2:
-                entity_merge_info.append({
-                    "entity": entity.get('text'),
-                    "merged_keywords": list(keywords_in_entity),
-                    "label": entity.get('label')
+                sentiments = analyze_sentiment_batch([comment.body for comment in comments])
+            else:
+                sentiments = [(0.0, "neutral")] * len(comments)
+            for comment, (comment_sentiment_score, comment_sentiment_label) in zip(comments, sentiments):
+                comments_data.append({
+                    "author": str(comment.author),
+                    "body": comment.body,
+                    "score": comment.score,
+                    "created_utc": datetime.fromtimestamp(comment.created_utc).isoformat(),
+                    "sentiment_score": comment_sentiment_score,
+                    "sentiment_label": comment_sentiment_label
                 })
-                for kw in keywords_in_entity[1:]:
-                    matched_keywords.discard(kw)
-    total_matched = len(matched_keywords)
-    total_required = len(keyword_words)
-    missing_keywords = [kw for kw in keyword_words if kw not in matched_keywords]
-    if strict_mode:
-        passes = total_matched >= total_required
+        except Exception as e:
+            log_message("error", f"Failed to scrape comments: {str(e)}")
+        return comments_data
+class KeywordPhraseMatcher:
+    def __init__(self, keywords):
+        self.nlp = spacy.blank("en")
+        self.matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
+        phrases = set()
+        for keyword in keywords:
+            words = keyword.strip().lower().split()
+            for start in range(len(words)):
+                for end in range(start + 2, len(words) + 1):
+                    phrases.add(" ".join(words[start:end]))
+        self.phrase_count = len(phrases)
+        if phrases:
+            self.matcher.add("KEYWORD_PHRASE", [self.nlp.make_doc(phrase) for phrase in sorted(phrases)])
+    def find(self, title):
+        doc = self.nlp.make_doc(title)
+        spans = filter_spans([doc[start:end] for _, start, end in self.matcher(doc)])
+        return [{"text": span.text, "label": "KEYWORD_PHRASE"} for span in spans]
+def configure_keyword_phrase_matcher(config, keywords):
+    global keyword_phrase_matcher
+    keyword_phrase_matcher = None
+    if config.get('entity_merge_strategy', 'ner') != 'phrase':
+        return None
+    if isinstance(keywords, list):
+        keyword_list = [k.strip() for k in keywords if k.strip()]
     else:
-        if total_required <= 2:
+        keyword_list = [k.strip() for k in str(keywords).split(',') if k.strip()]
+    keyword_phrase_matcher = KeywordPhraseMatcher(keyword_list)
+    log_message("info", f"Entity merging uses {keyword_phrase_matcher.phrase_count} keyword phrases instead of full NER on titles")
+    return keyword_phrase_matcher
+def check_keyword_match(title, keyword, strict_mode, count_entities, entity_recognition_enabled):
+    with timed_stage("match"):
+        title_lower = title.lower()
+        keyword_lower = keyword.strip().lower()
+        keyword_words = [w.strip() for w in keyword_lower.split() if w.strip()]
+        matched_keywords = set()
+        for word in keyword_words:
+            if word in title_lower:
+                matched_keywords.add(word)
+        entity_merge_info = []
+        if count_entities and entity_recognition_enabled and len(matched_keywords) >= 2:
+            if keyword_phrase_matcher is not None:
+                detected_entities = keyword_phrase_matcher.find(title)
+            else:
+                detected_entities = extract_entities(title)
+            for entity in detected_entities:
+                entity_text = entity.get('text', '').lower()
+                keywords_in_entity = [kw for kw in matched_keywords if kw in entity_text]
+                if len(keywords_in_entity) >= 2:
+                    entity_merge_info.append({
+                        "entity": entity.get('text'),
+                        "merged_keywords": list(keywords_in_entity),
+                        "label": entity.get('label')
+                    })
+                    for kw in keywords_in_entity[1:]:
+                        matched_keywords.discard(kw)
+        total_matched = len(matched_keywords)
+        total_required = len(keyword_words)
+        missing_keywords = [kw for kw in keyword_words if kw not in matched_keywords]
+        if strict_mode:
             passes = total_matched >= total_required
         else:
-            passes = total_matched >= (total_required - 1)
-    match_result = {
-        "matched": passes,
-        "matched_count": total_matched,
-        "total_required": total_required,
-        "matched_keywords": list(matched_keywords),
-        "missing_keywords": missing_keywords,
-        "entity_merges": entity_merge_info
-    }
-    return passes, match_result
+            if total_required <= 2:
+                passes = total_matched >= total_required
+            else:
+                passes = total_matched >= (total_required - 1)
+        match_result = {
+            "matched": passes,
+            "matched_count": total_matched,
+            "total_required": total_required,
+            "matched_keywords": list(matched_keywords),
+            "missing_keywords": missing_keywords,
+            "entity_merges": entity_merge_info
+        }
+        return passes, match_result
 def apply_filters(post, filters):
-    if filters.get('min_comments', 0) > 0 and post.num_comments < filters['min_comments']:
-        return False, f"Comments below minimum ({post.num_comments} < {filters['min_comments']})"
-    if filters.get('min_score', 0) > 0 and post.score < filters['min_score']:
-        return False, f"Score below minimum ({post.score} < {filters['min_score']})"
-    if filters.get('exclude_stickied', False) and post.stickied:
-        return False, "Post is stickied"
-    if filters.get('exclude_over_18', False) and post.over_18:
-        return False, "Post is NSFW"
-    return True, ""
+    with timed_stage("filter"):
+        if filters.get('min_comments', 0) > 0 and post.num_comments < filters['min_comments']:
+            return False, f"Comments below minimum ({post.num_comments} < {filters['min_comments']})"
+        if filters.get('min_score', 0) > 0 and post.score < filters['min_score']:
+            return False, f"Score below minimum ({post.score} < {filters['min_score']})"
+        if filters.get('exclude_stickied', False) and post.stickied:
+            return False, "Post is stickied"
+        if filters.get('exclude_over_18', False) and post.over_18:
+            return False, "Post is NSFW"
+        post_type = filters.get('post_type', 'any')
+        if post_type == 'self' and not post.is_self:
+            return False, "Post is not a text post"
+        if post_type == 'link' and post.is_self:
+            return False, "Post is not a link post"
+        return True, ""
+class PostRecord:
+    __slots__ = ("id", "title", "selftext", "author", "subreddit", "url", "created_utc", "score", "num_comments", "upvote_ratio", "permalink", "link_flair_text", "over_18", "spoiler", "stickied", "is_self", "crosspost_parent")
+    def __init__(self, data):
+        author = data.get("author")
+        self.id = data["id"]
+        self.title = data.get("title") or ""
+        self.selftext = data.get("selftext") or ""
+        self.author = None if author in (None, "[deleted]") else author
+        self.subreddit = data.get("subreddit") or ""
+        self.url = data.get("url") or ""
+        self.created_utc = data.get("created_utc") or 0
+        self.score = data.get("score") or 0
+        self.num_comments = data.get("num_comments") or 0
+        self.upvote_ratio = data.get("upvote_ratio") or 0
+        self.permalink = data.get("permalink") or ""
+        self.link_flair_text = data.get("link_flair_text")
+        self.over_18 = bool(data.get("over_18"))
+        self.spoiler = bool(data.get("spoiler"))
+        self.stickied = bool(data.get("stickied"))
+        self.is_self = bool(data.get("is_self"))
+        self.crosspost_parent = data.get("crosspost_parent")
+    @property
+    def fullname(self):
+        return f"t3_{self.id}"
+class SubredditListings:
+    def __init__(self, reddit, name):
+        self.reddit = reddit
+        self.display_name = name
+    def __str__(self):
+        return self.display_name
+    def listing(self, endpoint, params, limit, follow=True, keyword=None):
+        params = dict(params)
+        params["limit"] = limit or 1024
+        yielded = 0
+        while True:
+            with timed_stage("fetch"), ledger_work_item(self.display_name, keyword):
+                response = self.reddit.request(method="GET", path=f"r/{self.display_name}/{endpoint}", params=params)
+            data = response.get("data", {}) if isinstance(response, dict) else {}
+            children = data.get("children") or []
+            if not children:
+                return
+            for child in children:
+                if child.get("kind") != "t3":
+                    continue
+                run_counters["posts_fetched"] += 1
+                yield PostRecord(child["data"])
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    return
+            after = data.get("after")
+            if not follow or not after or after == params.get("after"):
+                return
+            params["after"] = after
+    def search(self, query, sort="relevance", syntax="lucene", time_filter="all", limit=100, keyword=None):
+        return self.listing("search", {"q": query, "restrict_sr": True, "sort": sort, "syntax": syntax, "t": time_filter}, limit, keyword=keyword or query)
+    def top(self, time_filter="all", limit=100):
+        return self.listing("top", {"t": time_filter}, limit)
+    def hot(self, limit=100):
+        return self.listing("hot", {}, limit)
+    def new(self, limit=100, before=None):
+        if before is None:
+            return self.listing("new", {}, limit)
+        return self.listing("new", {"before": before}, limit, follow=False)
+def plan_search_query(keyword, filters, config):
+    plan = {
+        "query": keyword,
+        "sort": "relevance",
+        "time_filter": filters.get('time_filter', 'all'),
+        "stop_field": None,
+        "threshold": 0
+    }
+    if not config.get('filter_pushdown', True):
+        return plan
+    rewrite = config.get('filter_pushdown_rewrite', False)
+    query_terms = []
+    keyword_words = keyword.split()
+    if rewrite and keyword_words and (filters.get('strict_keyword_matching', False) or len(keyword_words) <= 2) and not any(c in keyword for c in '():"'):
+        query_terms.append(f"title:({keyword})")
+    else:
+        query_terms.append(keyword)
+    if filters.get('exclude_over_18', False):
+        query_terms.append("nsfw:no")
+    post_type = filters.get('post_type', 'any')
+    if post_type == 'self':
+        query_terms.append("self:yes")
+    elif post_type == 'link':
+        query_terms.append("self:no")
+    plan["query"] = " ".join(query_terms)
+    if not rewrite:
+        return plan
+    if filters.get('min_score', 0) > 0:
+        plan.update(sort="top", stop_field="score", threshold=filters['min_score'])
+    elif filters.get('min_comments', 0) > 0:
+        plan.update(sort="comments", stop_field="num_comments", threshold=filters['min_comments'])
+    return plan
+def plan_listing_query(filters, config, listing="hot"):
+    plan = {
+        "listing": listing,
+        "time_filter": filters.get('time_filter', 'all'),
+        "stop_field": None,
+        "threshold": 0
+    }
+    if not config.get('filter_pushdown', True) or filters.get('min_score', 0) <= 0:
+        return plan
+    if listing == "hot" and config.get('filter_pushdown_rewrite', False):
+        plan["listing"] = "top"
+    if plan["listing"] == "top":
+        plan.update(stop_field="score", threshold=filters['min_score'])
+    return plan
+def take_until_below_threshold(listing, plan, patience=3):
+    posts = []
+    below_threshold = 0
+    for post in listing:
+        posts.append(post)
+        if plan["stop_field"] is None:
+            continue
+        if getattr(post, plan["stop_field"]) < plan["threshold"]:
+            below_threshold += 1
+            if below_threshold >= patience:
+                break
+        else:
+            below_threshold = 0
+    return posts
+def fetch_search_posts(subreddit, keyword, filters, config, limit):
+    plan = plan_search_query(keyword, filters, config)
+    listing = subreddit.search(plan["query"], sort=plan["sort"], time_filter=plan["time_filter"], limit=limit, keyword=keyword)
+    return take_until_below_threshold(listing, plan, config.get('early_stop_patience', 3))
+def fetch_listing_posts(subreddit, filters, config, limit):
+    plan = plan_listing_query(filters, config)
+    if plan["listing"] == "top":
+        listing = subreddit.top(time_filter=plan["time_filter"], limit=limit)
+    else:
+        listing = subreddit.hot(limit=limit)
+    return take_until_below_threshold(listing, plan, config.get('early_stop_patience', 3))
 def categorize_and_log_error(error, context=""):
     error_type = type(error).__name__
     error_msg = str(error)
@@ -228,6 +739,7 @@ def handle_reddit_request(func, *args, max_retries=3, **kwargs):
                 wait_time = min(retry_after, 300)
                 log_message("error", f"[RATE LIMIT] Reddit API rate limit hit. Waiting {wait_time}s before retry {attempt + 1}/{max_retries}")
                 send_rate_limit_warning(wait_time)
+                record_stage("backoff", wait_time)
                 time.sleep(wait_time)
                 if attempt == max_retries - 1:
                     categorize_and_log_error(e, "Max retries reached")
@@ -247,6 +759,7 @@ def handle_reddit_request(func, *args, max_retries=3, **kwargs):
                 log_message("error", f"[NETWORK ERROR] Connection issue - Retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
             else:
                 categorize_and_log_error(e, "Max retries reached - check your internet connection")
+            record_stage("backoff", wait_time)
             time.sleep(wait_time)
             if attempt == max_retries - 1:
                 raise
@@ -270,12 +783,579 @@ def add_recent_activity(supabase: Client, user_id: str, activity_text: str):
         }).execute()
     except Exception as e:
         categorize_and_log_error(e, "Failed to add recent activity")
+def write_run_summary(supabase: Client, summary):
+    try:
+        supabase.table('scraper_runs').insert(summary).execute()
+    except Exception as e:
+        categorize_and_log_error(e, "Failed to save run summary")
+def get_scraper_version():
+    try:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'package.json'), 'r', encoding='utf-8') as f:
+            return json.load(f).get('version')
+    except (OSError, ValueError):
+        return None
+def build_run_summary(run_id, user_id, preset, mode, config, pipeline, started_at, stage_timings, ledger_info, status):
+    wall_time = time.time() - started_at
+    rejections = dict(run_counters["rejections"])
+    duplicates = rejections.pop("Duplicate", 0)
+    near_duplicates = rejections.pop("Near-duplicate", 0)
+    peak_rss_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+    if pipeline.governor is not None:
+        peak_rss_mb = max(peak_rss_mb, pipeline.governor.peak_rss_mb)
+    return {
+        "run_id": run_id,
+        "user_id": user_id or None,
+        "preset_id": preset.get('id'),
+        "preset_name": preset.get('name'),
+        "mode": mode,
+        "runtime_mode": config.get('runtime_mode', 'once'),
+        "status": status,
+        "scraper_version": get_scraper_version(),
+        "started_at": datetime.fromtimestamp(started_at, timezone.utc).isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "wall_time_seconds": round(wall_time, 3),
+        "posts_fetched": run_counters["posts_fetched"],
+        "posts_accepted": pipeline.posts_saved,
+        "posts_rejected": sum(rejections.values()),
+        "posts_duplicate": duplicates,
+        "posts_near_duplicate": near_duplicates,
+        "rejection_reasons": rejections,
+        "requests_made": ledger_info["requests"] if ledger_info else None,
+        "rate_limited_count": ledger_info["rate_limited"] if ledger_info else None,
+        "stage_seconds": {stage: round(timing["total_ms"] / 1000, 3) for stage, timing in stage_timings.items()} if stage_timings else None,
+        "posts_per_second": round(pipeline.posts_saved / wall_time, 3) if wall_time > 0 else 0.0,
+        "peak_rss_mb": round(peak_rss_mb, 1)
+    }
 def log_empty_results(subreddit_name, keyword=None, mode="search"):
     if keyword:
         log_message("info", f"No posts found for keyword '{keyword}' in r/{subreddit_name}")
     else:
         log_message("info", f"r/{subreddit_name} returned 0 posts in {mode} mode")
-def scrape_keyword_mode(reddit, subreddit_list, keywords, config, filters, start_time, supabase, user_id, preset, rate_limiter):
+def format_keywords_found(keyword, match_info):
+    if match_info is None:
+        return ""
+    return ", ".join(match_info["matched_keywords"]) if match_info["matched_keywords"] else keyword
+def build_post_data(post, config, preset, search_mode, keyword="", match_info=None, keywords_found=None, enrich=True):
+    deferred = config.get('enrichment_mode') == 'deferred'
+    sentiment_score = 0.0
+    sentiment_label = "neutral"
+    if config.get('sentiment_analysis', True) and not deferred and enrich:
+        sentiment_score, sentiment_label = analyze_sentiment(post.title + " " + (post.selftext or ""))
+    entities_data = []
+    if config.get('entity_recognition', False) and not deferred and enrich:
+        entities_data = extract_entities(post.title + " " + (post.selftext or ""))
+    if keywords_found is None:
+        keywords_found = format_keywords_found(keyword, match_info)
+    post_data = {
+        "post_id": post.id,
+        "title": post.title,
+        "body": post.selftext or "",
+        "author": str(post.author) if post.author else "[deleted]",
+        "subreddit": str(post.subreddit),
+        "url": post.url,
+        "created_utc": datetime.fromtimestamp(post.created_utc).isoformat(),
+        "score": post.score,
+        "num_comments": post.num_comments,
+        "upvote_ratio": post.upvote_ratio,
+        "permalink": f"https://reddit.com{post.permalink}",
+        "link_flair_text": post.link_flair_text or "",
+        "over_18": post.over_18,
+        "spoiler": post.spoiler,
+        "stickied": post.stickied,
+        "sentiment_score": sentiment_score,
+        "sentiment_label": sentiment_label,
+        "entities": entities_data,
+        "comments": [],
+        "keywords_found": keywords_found,
+        "collected_at": datetime.utcnow().isoformat() + 'Z',
+        "search_mode": search_mode,
+        "batch_id": f"batch_{int(time.time())}",
+        "preset_name": preset.get('name', 'Unknown'),
+        "preset_id": preset.get('id', ''),
+        "keyword_used": keyword
+    }
+    if deferred:
+        post_data["enrichment_status"] = "pending"
+    return post_data
+def log_accepted_post(post_data, match_info=None):
+    if match_info is None:
+        log_message("success", 
+            f"✅ ACCEPTED: \"{post_data['title'][:60]}...\"\n              - Score: {post_data['score']} | Comments: {post_data['num_comments']}",
+            post_data['post_id'])
+        return
+    entity_info = ""
+    if match_info.get("entity_merges"):
+        merged_entities = []
+        for merge in match_info["entity_merges"]:
+            merged_entities.append(f"\"{merge['entity']}\" ({merge['label']})")
+        entity_info = f"\n              - Entities merged: {', '.join(merged_entities)}"
+    matched_kw_str = ", ".join([f'"{k}"' for k in match_info["matched_keywords"]])
+    log_message("success", 
+        f"✅ ACCEPTED: \"{post_data['title'][:60]}...\"\n              - Matched {match_info['matched_count']}/{match_info['total_required']} keywords: {matched_kw_str}\n              - Score: {post_data['score']} | Comments: {post_data['num_comments']}{entity_info}",
+        post_data['post_id'])
+def clone_reddit(reddit):
+    worker_reddit = praw.Reddit(
+        client_id=reddit.config.client_id,
+        client_secret=reddit.config.client_secret,
+        user_agent=reddit.config.user_agent,
+        oauth_url=reddit.config.oauth_url,
+        reddit_url=reddit.config.reddit_url,
+        check_for_updates=reddit.config.check_for_updates
+    )
+    if api_ledger is not None:
+        instrument_session(worker_reddit._core._requestor._http, "reddit", api_ledger)
+    return worker_reddit
+class CommentStage:
+    def __init__(self, reddit, workers, rate_limiter, max_comments, enable_sentiment, comment_depth):
+        self.reddit = reddit
+        self.local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="comments")
+        self.rate_limiter = rate_limiter
+        self.max_comments = max_comments
+        self.enable_sentiment = enable_sentiment
+        self.comment_depth = comment_depth
+        self.workers = workers
+        self.max_pending = workers * 4
+        self.pending = {}
+    def set_scale(self, scale):
+        self.max_pending = max(1, round(self.workers * 4 * scale))
+    def worker_reddit(self):
+        reddit = getattr(self.local, "reddit", None)
+        if reddit is None:
+            reddit = self.local.reddit = clone_reddit(self.reddit)
+        return reddit
+    def fetch(self, post):
+        self.rate_limiter.wait_if_needed()
+        with ledger_work_item(post.subreddit):
+            return scrape_comments(self.worker_reddit().submission(id=post.id), self.max_comments, self.enable_sentiment, self.comment_depth)
+    def submit(self, post, on_complete):
+        while len(self.pending) >= self.max_pending:
+            self.drain(block=True)
+        future = self.executor.submit(self.fetch, post)
+        self.pending[future] = on_complete
+    def drain(self, block=False):
+        if not self.pending:
+            return
+        with timed_stage("comment_wait") if block else NULL_STAGE:
+            done, _ = wait(list(self.pending), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            on_complete = self.pending.pop(future)
+            try:
+                comments_data = future.result()
+            except Exception as e:
+                log_message("error", f"Failed to scrape comments: {str(e)}")
+                comments_data = []
+            on_complete(comments_data)
+    def flush(self):
+        while self.pending:
+            self.drain(block=True)
+    def shutdown(self):
+        self.flush()
+        self.executor.shutdown(wait=True)
+def init_cpu_worker():
+    global analysis_cache, stage_timer
+    analysis_cache = None
+    if stage_timer is not None:
+        stage_timer = StageTimer(stage_timer.interval)
+def enrich_chunk(rows, sentiment_enabled, entities_enabled, known=None):
+    global analysis_cache
+    analysis_cache = ChunkAnalysisCache(known) if known is not None else None
+    rows = enrich_rows(rows, sentiment_enabled, entities_enabled)
+    computed = analysis_cache.computed if analysis_cache is not None else None
+    return rows, stage_timer.export(reset=True) if stage_timer is not None else None, computed
+def cpu_pool_size(config):
+    requested = config.get('cpu_workers', 0)
+    if requested:
+        return requested
+    budget_mb = config.get('cpu_memory_budget_mb') or psutil.virtual_memory().available / (1024 * 1024) / 2
+    worker_mb = max(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    return max(1, min((os.cpu_count() or 1) - 1, int(budget_mb // worker_mb)))
+def can_fork_workers():
+    return 'fork' in multiprocessing.get_all_start_methods() and sys.platform != 'darwin'
+class CpuStage:
+    def __init__(self, workers, chunk_size, sentiment_enabled, entities_enabled, on_complete):
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"), initializer=init_cpu_worker)
+        for future in [self.executor.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.sentiment_enabled = sentiment_enabled
+        self.entities_enabled = entities_enabled
+        self.on_complete = on_complete
+        self.max_pending = workers * 2
+        self.buffer = []
+        self.pending = {}
+        self.spill_path = os.path.join(get_state_directory(), f"cpu_spill_{os.getpid()}.jsonl")
+        self.spilling = False
+        self.spilled = 0
+    def set_scale(self, scale):
+        self.max_pending = max(1, round(self.workers * 2 * scale))
+        self.spilling = scale < 1.0
+    def submit(self, post_data, match_info, dedup_key):
+        self.buffer.append((post_data, match_info, dedup_key))
+        if len(self.buffer) >= self.chunk_size:
+            self.dispatch()
+    def dispatch(self):
+        if not self.buffer:
+            return
+        if self.spilling and len(self.pending) >= self.max_pending:
+            self.spill()
+            return
+        while len(self.pending) >= self.max_pending:
+            self.drain(block=True)
+        chunk = self.buffer
+        self.buffer = []
+        if self.executor is None:
+            self.enrich_in_process(chunk)
+            return
+        rows = [post_data for post_data, _, _ in chunk]
+        known = lookup_analysis_cache(rows, self.sentiment_enabled, self.entities_enabled) if analysis_cache is not None else None
+        try:
+            future = self.executor.submit(enrich_chunk, rows, self.sentiment_enabled, self.entities_enabled, known)
+        except BrokenProcessPool:
+            self.mark_broken()
+            self.enrich_in_process(chunk)
+            return
+        self.pending[future] = chunk
+    def mark_broken(self):
+        if self.executor is None:
+            return
+        log_message("error", "A CPU worker process died; enriching the rest of this run in-process")
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.max_pending = 1
+    def enrich_in_process(self, chunk):
+        rows = enrich_rows([post_data for post_data, _, _ in chunk], self.sentiment_enabled, self.entities_enabled)
+        for (_, match_info, dedup_key), row in zip(chunk, rows):
+            self.on_complete(row, match_info, dedup_key)
+    def spill(self):
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            for entry in self.buffer:
+                f.write(json.dumps(entry) + "\n")
+        self.spilled += len(self.buffer)
+        self.buffer = []
+    def unspill(self):
+        if self.spilling or not os.path.exists(self.spill_path):
+            return
+        draining_path = self.spill_path + '.draining'
+        os.replace(self.spill_path, draining_path)
+        with open(draining_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                post_data, match_info, dedup_key = json.loads(line)
+                self.submit(post_data, match_info, dedup_key)
+                self.drain()
+        os.remove(draining_path)
+    def drain(self, block=False):
+        if not self.pending:
+            return
+        with timed_stage("cpu_wait") if block else NULL_STAGE:
+            done, _ = wait(list(self.pending), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            chunk = self.pending.pop(future)
+            try:
+                rows, timings, computed = future.result()
+                if timings and stage_timer is not None:
+                    stage_timer.merge(timings)
+                if computed and analysis_cache is not None:
+                    for (kind, text), value in computed.items():
+                        analysis_cache.put(kind, text, value)
+            except BrokenProcessPool:
+                self.mark_broken()
+                self.enrich_in_process(chunk)
+                continue
+            except Exception as e:
+                log_message("error", f"CPU worker failed, enriching {len(chunk)} posts in-process: {str(e)}")
+                self.enrich_in_process(chunk)
+                continue
+            for (_, match_info, dedup_key), row in zip(chunk, rows):
+                self.on_complete(row, match_info, dedup_key)
+    def flush(self):
+        self.spilling = False
+        self.unspill()
+        self.dispatch()
+        while self.pending:
+            self.drain(block=True)
+    def shutdown(self):
+        self.flush()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+class ResourceGovernor:
+    def __init__(self, config):
+        self.memory_budget_mb = config.get('memory_budget_mb')
+        self.ram_high_percent = config.get('governor_ram_high_percent', 85)
+        self.ram_low_percent = config.get('governor_ram_low_percent', 70)
+        self.interval = config.get('governor_interval', 5)
+        self.min_scale = config.get('governor_min_scale', 0.25)
+        self.scale = 1.0
+        self.last_check = 0
+        self.process = psutil.Process()
+        self.peak_rss_mb = 0
+        self.adjustments = 0
+    def process_tree_rss_mb(self):
+        total = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total / (1024 * 1024)
+    def check(self):
+        now = time.time()
+        if now - self.last_check < self.interval:
+            return None
+        self.last_check = now
+        rss_mb = self.process_tree_rss_mb()
+        ram_percent = psutil.virtual_memory().percent
+        self.peak_rss_mb = max(self.peak_rss_mb, rss_mb)
+        over_budget = self.memory_budget_mb and rss_mb > self.memory_budget_mb
+        under_budget = not self.memory_budget_mb or rss_mb < self.memory_budget_mb * 0.8
+        if over_budget or ram_percent > self.ram_high_percent:
+            scale = max(self.min_scale, self.scale / 2)
+        elif under_budget and ram_percent < self.ram_low_percent:
+            scale = min(1.0, self.scale + 0.25)
+        else:
+            return None
+        if scale == self.scale:
+            return None
+        direction = "down" if scale < self.scale else "up"
+        self.scale = scale
+        self.adjustments += 1
+        budget_text = f" / {self.memory_budget_mb}MB budget" if self.memory_budget_mb else ""
+        log_message("info", f"Resource governor scaling {direction} to {int(scale * 100)}% (RSS {int(rss_mb)}MB{budget_text}, RAM {ram_percent:.0f}%)")
+        return scale
+class RunDeduplicator:
+    def __init__(self, match_crossposts=False, max_entries=100000):
+        self.match_crossposts = match_crossposts
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.duplicates = 0
+    def key_for(self, post):
+        if self.match_crossposts:
+            crosspost_parent = getattr(post, 'crosspost_parent', None)
+            if crosspost_parent:
+                return crosspost_parent.split('_', 1)[-1]
+        return post.id
+    def admit(self, post, keywords_found):
+        key = self.key_for(post)
+        keywords = [k for k in keywords_found.split(", ") if k]
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = {"post_id": post.id, "keywords": keywords, "saved": False, "dirty": False}
+            return None
+        self.duplicates += 1
+        for keyword in keywords:
+            if keyword not in entry["keywords"]:
+                entry["keywords"].append(keyword)
+                entry["dirty"] = True
+        return entry
+    def mark_saved(self, key, post_id):
+        entry = self.entries.get(key)
+        if entry is not None and entry["post_id"] == post_id:
+            entry["saved"] = True
+    def take_pending_merges(self):
+        merges = [entry for entry in self.entries.values() if entry["dirty"] and entry["saved"]]
+        for entry in merges:
+            entry["dirty"] = False
+        return merges
+    def evict_overflow(self):
+        evicted = []
+        while len(self.entries) > self.max_entries:
+            _, entry = self.entries.popitem(last=False)
+            evicted.append(entry)
+        return evicted
+MINHASH_PRIME = (1 << 61) - 1
+class NearDuplicateIndex:
+    def __init__(self, threshold=0.7, max_entries=20000, num_permutations=32, rows_per_band=4):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.rows_per_band = rows_per_band
+        self.band_count = num_permutations // rows_per_band
+        seeded_random = random.Random(7919)
+        self.permutations = [(seeded_random.randrange(1, MINHASH_PRIME), seeded_random.randrange(0, MINHASH_PRIME)) for _ in range(num_permutations)]
+        self.signatures = OrderedDict()
+        self.bands = [{} for _ in range(self.band_count)]
+        self.near_duplicates = 0
+    def signature(self, text):
+        words = re.findall(r"\w+", text.lower()[:4000])
+        shingles = {words[i] + " " + words[i + 1] for i in range(len(words) - 1)}
+        if len(shingles) < 8:
+            return None
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big') for shingle in shingles]
+        return array('I', [min((a * h + b) % MINHASH_PRIME for h in hashes) & 0xffffffff for a, b in self.permutations])
+    def band_keys(self, signature):
+        rows = self.rows_per_band
+        return [hash(tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.band_count)]
+    def find(self, post_id, signature):
+        candidates = set()
+        for band, key in enumerate(self.band_keys(signature)):
+            candidates.update(self.bands[band].get(key, ()))
+        candidates.discard(post_id)
+        best_post_id = None
+        best_similarity = self.threshold
+        for candidate_id in candidates:
+            candidate_signature = self.signatures[candidate_id]
+            similarity = sum(1 for x, y in zip(signature, candidate_signature) if x == y) / len(signature)
+            if similarity >= best_similarity:
+                best_post_id = candidate_id
+                best_similarity = similarity
+        return best_post_id
+    def add(self, post_id, signature):
+        if post_id in self.signatures:
+            return
+        self.signatures[post_id] = signature
+        for band, key in enumerate(self.band_keys(signature)):
+            self.bands[band].setdefault(key, set()).add(post_id)
+        while len(self.signatures) > self.max_entries:
+            old_post_id, old_signature = self.signatures.popitem(last=False)
+            for band, key in enumerate(self.band_keys(old_signature)):
+                bucket = self.bands[band].get(key)
+                if bucket is not None:
+                    bucket.discard(old_post_id)
+                    if not bucket:
+                        del self.bands[band][key]
+    def load(self, filename):
+        for post_id, signature_hex in load_state_file(filename, []):
+            signature = array('I')
+            signature.frombytes(bytes.fromhex(signature_hex))
+            if len(signature) == len(self.permutations):
+                self.add(post_id, signature)
+    def save(self, filename):
+        save_state_file(filename, [[post_id, signature.tobytes().hex()] for post_id, signature in self.signatures.items()])
+class PostPipeline:
+    def __init__(self, config, preset, supabase, rate_limiter, reddit=None):
+        self.reddit = reddit
+        self.config = config
+        self.preset = preset
+        self.supabase = supabase
+        self.posts_saved = 0
+        self.scrape_comments_enabled = config.get('scrape_comments') or config.get('scrapeComments', False)
+        self.max_comments = config.get('max_comments_per_post') or config.get('maxCommentsPerPost', 5)
+        self.comment_depth = config.get('comment_depth', 2)
+        deferred = config.get('enrichment_mode') == 'deferred'
+        sentiment_enabled = config.get('sentiment_analysis', True) and not deferred
+        entities_enabled = config.get('entity_recognition', False) and not deferred
+        self.cpu_stage = None
+        if (sentiment_enabled or entities_enabled) and can_fork_workers():
+            cpu_workers = cpu_pool_size(config)
+            if cpu_workers > 1:
+                get_sentiment_engine()
+                self.cpu_stage = CpuStage(cpu_workers, config.get('cpu_chunk_size', 16), sentiment_enabled, entities_enabled, self.save)
+                log_message("info", f"CPU stage running on {cpu_workers} worker processes")
+        self.comment_sentiment = sentiment_enabled and self.cpu_stage is None
+        comment_workers = config.get('comment_workers', 4)
+        self.comment_stage = None
+        if self.scrape_comments_enabled and comment_workers > 1:
+            self.comment_stage = CommentStage(reddit, comment_workers, rate_limiter, self.max_comments, self.comment_sentiment, self.comment_depth)
+        self.deduplicator = RunDeduplicator(config.get('dedup_crossposts', False), config.get('dedup_max_entries', 100000))
+        self.near_duplicate_index = None
+        self.near_duplicate_action = config.get('near_duplicate_action', 'skip')
+        if config.get('near_duplicate_detection', False):
+            self.near_duplicate_index = NearDuplicateIndex(config.get('near_duplicate_threshold', 0.7), config.get('near_duplicate_max_entries', 20000))
+            self.near_duplicate_index.load('near_duplicates.json')
+        self.governor = ResourceGovernor(config) if config.get('resource_governor', True) else None
+    def govern(self):
+        if self.governor is None:
+            return
+        scale = self.governor.check()
+        if scale is None:
+            return
+        if self.comment_stage is not None:
+            self.comment_stage.set_scale(scale)
+        if self.cpu_stage is not None:
+            self.cpu_stage.set_scale(scale)
+            self.cpu_stage.unspill()
+    def submit(self, post, search_mode, keyword="", match_info=None, keywords_found=None):
+        self.govern()
+        if keywords_found is None:
+            keywords_found = format_keywords_found(keyword, match_info)
+        existing = self.deduplicator.admit(post, keywords_found)
+        if existing is not None:
+            reason = "Already collected this run" if existing["post_id"] == post.id else f"Crosspost of {existing['post_id']} already collected this run"
+            log_message("rejected", 
+                f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: {reason}",
+                post.id, 
+                "Duplicate")
+            return False
+        self.write_keyword_merges([entry for entry in self.deduplicator.evict_overflow() if entry["dirty"] and entry["saved"]])
+        canonical_post_id = None
+        if self.near_duplicate_index is not None:
+            signature = self.near_duplicate_index.signature(post.title + " " + (post.selftext or ""))
+            if signature is not None:
+                canonical_post_id = self.near_duplicate_index.find(post.id, signature)
+                if canonical_post_id is None:
+                    self.near_duplicate_index.add(post.id, signature)
+                else:
+                    self.near_duplicate_index.near_duplicates += 1
+                    if self.near_duplicate_action != 'link':
+                        log_message("rejected", 
+                            f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: Near-duplicate of {canonical_post_id}",
+                            post.id, 
+                            "Near-duplicate")
+                        return False
+        post_data = build_post_data(post, self.config, self.preset, search_mode, keyword, match_info, keywords_found, enrich=self.cpu_stage is None)
+        if canonical_post_id is not None:
+            post_data["duplicate_of"] = canonical_post_id
+        dedup_key = self.deduplicator.key_for(post)
+        if self.comment_stage is not None:
+            self.comment_stage.submit(post, lambda comments_data: self.enrich_and_save(post_data, match_info, dedup_key, comments_data))
+            self.comment_stage.drain()
+            return True
+        comments_data = []
+        if self.scrape_comments_enabled:
+            with ledger_work_item(post.subreddit, keyword):
+                comments_data = scrape_comments(self.reddit.submission(id=post.id), self.max_comments, self.comment_sentiment, self.comment_depth)
+        return self.enrich_and_save(post_data, match_info, dedup_key, comments_data)
+    def enrich_and_save(self, post_data, match_info, dedup_key, comments_data):
+        post_data["comments"] = comments_data
+        if self.cpu_stage is None:
+            return self.save(post_data, match_info, dedup_key)
+        self.cpu_stage.submit(post_data, match_info, dedup_key)
+        self.cpu_stage.drain()
+        return True
+    def save(self, post_data, match_info, dedup_key):
+        try:
+            with timed_stage("db_insert"), ledger_work_item(post_data.get('subreddit'), post_data.get('keyword_used')):
+                self.supabase.table('reddit_posts').insert(post_data).execute()
+        except Exception as e:
+            categorize_and_log_error(e, f"Failed to save post '{post_data['title'][:30]}...' to database")
+            return False
+        self.deduplicator.mark_saved(dedup_key, post_data["post_id"])
+        log_accepted_post(post_data, match_info)
+        self.posts_saved += 1
+        return True
+    def write_keyword_merges(self, merges):
+        for entry in merges:
+            try:
+                with timed_stage("db_update"):
+                    self.supabase.table('reddit_posts').update({"keywords_found": ", ".join(entry["keywords"])}).eq('post_id', entry["post_id"]).execute()
+            except Exception as e:
+                categorize_and_log_error(e, f"Failed to merge keywords into post {entry['post_id']}")
+    def drain(self):
+        self.govern()
+        if self.comment_stage is not None:
+            self.comment_stage.drain()
+        if self.cpu_stage is not None:
+            self.cpu_stage.dispatch()
+            self.cpu_stage.drain()
+        self.write_keyword_merges(self.deduplicator.take_pending_merges())
+    def close(self):
+        if self.comment_stage is not None:
+            self.comment_stage.shutdown()
+        if self.cpu_stage is not None:
+            self.cpu_stage.shutdown()
+            if self.cpu_stage.spilled:
+                log_message("info", f"Resource governor spilled {self.cpu_stage.spilled} posts to disk under memory pressure")
+        self.write_keyword_merges(self.deduplicator.take_pending_merges())
+        if self.deduplicator.duplicates:
+            log_message("info", f"Skipped {self.deduplicator.duplicates} duplicate posts already collected this run")
+        if self.near_duplicate_index is not None:
+            self.near_duplicate_index.save('near_duplicates.json')
+            action = "linked" if self.near_duplicate_action == 'link' else "skipped"
+            log_message("info", f"Near-duplicate filter {action} {self.near_duplicate_index.near_duplicates} posts")
+    @property
+    def near_duplicates(self):
+        return self.near_duplicate_index.near_duplicates if self.near_duplicate_index is not None else 0
+def scrape_keyword_mode(reddit, subreddit_list, keywords, config, filters, start_time, pipeline, user_id, preset, rate_limiter):
     global stop_requested
     if isinstance(keywords, list):
         keyword_list = [k.strip() for k in keywords if k.strip()]
@@ -284,9 +1364,6 @@ def scrape_keyword_mode(reddit, subreddit_list, keywords, config, filters, start
     posts_collected = 0
     auto_stop_target = config.get('auto_stop_target') or config.get('autoStopTarget')
     max_posts_per_keyword = config.get('max_posts_per_keyword', 50)
-    scrape_comments_enabled = config.get('scrape_comments') or config.get('scrapeComments', False)
-    max_comments = config.get('max_comments_per_post') or config.get('maxCommentsPerPost', 5)
-    time_filter = filters.get('time_filter', 'all')
     total_keywords = len(keyword_list)
     total_subreddits = len(subreddit_list)
     for keyword_idx, keyword in enumerate(keyword_list):
@@ -303,9 +1380,9 @@ def scrape_keyword_mode(reddit, subreddit_list, keywords, config, filters, start
             send_progress("running", f"r/{subreddit_name}: {keyword}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, keyword_idx, total_keywords, subreddit_idx, total_subreddits, current_iteration_posts, max_posts_per_keyword, "keyword")
             try:
                 rate_limiter.wait_if_needed()
-                subreddit = reddit.subreddit(subreddit_name)
+                subreddit = SubredditListings(reddit, subreddit_name)
                 posts_generator = handle_reddit_request(
-                    lambda: list(subreddit.search(keyword, limit=max_posts_per_keyword, time_filter=time_filter))
+                    lambda: fetch_search_posts(subreddit, keyword, filters, config, max_posts_per_keyword)
                 )
                 if posts_generator is None:
                     log_message("error", f"Failed to retrieve posts from r/{subreddit_name}")
@@ -342,64 +1419,12 @@ def scrape_keyword_mode(reddit, subreddit_list, keywords, config, filters, start
                             post.id, 
                             f"Keyword mismatch: {match_info['matched_count']}/{match_info['total_required']}")
                         continue
-                    sentiment_score = 0.0
-                    sentiment_label = "neutral"
-                    if config.get('sentiment_analysis', True):
-                        sentiment_score, sentiment_label = analyze_sentiment(post.title + " " + (post.selftext or ""))
-                    entities_data = []
-                    if config.get('entity_recognition', False):
-                        entities_data = extract_entities(post.title + " " + (post.selftext or ""))
-                    comments_data = []
-                    if scrape_comments_enabled:
-                        comments_data = scrape_comments(post, max_comments, config.get('sentiment_analysis', True))
-                    keywords_found = ", ".join(match_info["matched_keywords"]) if match_info["matched_keywords"] else keyword
-                    post_data = {
-                        "post_id": post.id,
-                        "title": post.title,
-                        "body": post.selftext or "",
-                        "author": str(post.author) if post.author else "[deleted]",
-                        "subreddit": post.subreddit.display_name,
-                        "url": post.url,
-                        "created_utc": datetime.fromtimestamp(post.created_utc).isoformat(),
-                        "score": post.score,
-                        "num_comments": post.num_comments,
-                        "upvote_ratio": post.upvote_ratio,
-                        "permalink": f"https://reddit.com{post.permalink}",
-                        "link_flair_text": post.link_flair_text or "",
-                        "over_18": post.over_18,
-                        "spoiler": post.spoiler,
-                        "stickied": post.stickied,
-                        "sentiment_score": sentiment_score,
-                        "sentiment_label": sentiment_label,
-                        "entities": entities_data,
-                        "comments": comments_data,
-                        "keywords_found": keywords_found,
-                        "collected_at": datetime.utcnow().isoformat() + 'Z',
-                        "search_mode": "keyword",
-                        "batch_id": f"batch_{int(time.time())}",
-                        "preset_name": preset.get('name', 'Unknown'),
-                        "preset_id": preset.get('id', ''),
-                        "keyword_used": keyword
-                    }
-                    try:
-                        supabase.table('reddit_posts').insert(post_data).execute()
-                        entity_info = ""
-                        if match_info.get("entity_merges"):
-                            merged_entities = []
-                            for merge in match_info["entity_merges"]:
-                                merged_entities.append(f"\"{merge['entity']}\" ({merge['label']})")
-                            entity_info = f"\n              - Entities merged: {', '.join(merged_entities)}"
-                        matched_kw_str = ", ".join([f'"{k}"' for k in match_info["matched_keywords"]])
-                        log_message("success", 
-                            f"✅ ACCEPTED: \"{post.title[:60]}...\"\n              - Matched {match_info['matched_count']}/{match_info['total_required']} keywords: {matched_kw_str}\n              - Score: {post.score} | Comments: {post.num_comments}{entity_info}",
-                            post.id)
+                    if pipeline.submit(post, "keyword", keyword, match_info):
                         current_iteration_posts += 1
                         posts_collected += 1
                         cpu, ram = get_system_metrics()
                         elapsed = int(time.time() - start_time)
                         send_progress("running", f"r/{subreddit_name}: {keyword}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, keyword_idx, total_keywords, subreddit_idx, total_subreddits, current_iteration_posts, max_posts_per_keyword, "keyword")
-                    except Exception as e:
-                        categorize_and_log_error(e, f"Failed to save post '{post.title[:30]}...' to database")
             except Forbidden as e:
                 categorize_and_log_error(e, f"r/{subreddit_name}")
                 continue
@@ -415,14 +1440,144 @@ def scrape_keyword_mode(reddit, subreddit_list, keywords, config, filters, start
         elapsed = int(time.time() - start_time)
         send_progress("running", f"Completed keyword: {keyword}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, keyword_idx + 1, total_keywords, 0, total_subreddits, 0, 0, "keyword")
     return posts_collected
-def scrape_deepscan_mode(reddit, subreddit_list, config, filters, start_time, supabase, user_id, preset, rate_limiter):
+TIME_FILTER_SECONDS = {
+    "hour": 3600,
+    "day": 86400,
+    "week": 604800,
+    "month": 2592000,
+    "year": 31536000
+}
+class TitleIndex:
+    def __init__(self, posts):
+        self.postings = {}
+        self.word_cache = {}
+        for post_idx, post in enumerate(posts):
+            for token in set(post.title.lower().split()):
+                self.postings.setdefault(token, set()).add(post_idx)
+    def posts_containing(self, word):
+        if word not in self.word_cache:
+            matches = set()
+            for token, post_indices in self.postings.items():
+                if word in token:
+                    matches |= post_indices
+            self.word_cache[word] = matches
+        return self.word_cache[word]
+    def candidates(self, keyword, strict_mode):
+        keyword_words = [w.strip() for w in keyword.strip().lower().split() if w.strip()]
+        if not keyword_words:
+            return []
+        if strict_mode or len(keyword_words) <= 2:
+            required = len(keyword_words)
+        else:
+            required = len(keyword_words) - 1
+        unique_words = set(keyword_words)
+        required = min(required, len(unique_words))
+        match_counts = {}
+        for word in unique_words:
+            for post_idx in self.posts_containing(word):
+                match_counts[post_idx] = match_counts.get(post_idx, 0) + 1
+        return sorted(post_idx for post_idx, count in match_counts.items() if count >= required)
+def scrape_local_match_mode(reddit, subreddit_list, keywords, config, filters, start_time, pipeline, user_id, preset, rate_limiter):
     global stop_requested
+    if isinstance(keywords, list):
+        keyword_list = [k.strip() for k in keywords if k.strip()]
+    else:
+        keyword_list = [k.strip() for k in str(keywords).split(',') if k.strip()]
     posts_collected = 0
+    listing_requests = 0
     auto_stop_target = config.get('auto_stop_target') or config.get('autoStopTarget')
-    max_posts_per_subreddit = config.get('max_posts_per_subreddit', 50)
-    scrape_comments_enabled = config.get('scrape_comments') or config.get('scrapeComments', False)
-    max_comments = config.get('max_comments_per_post') or config.get('maxCommentsPerPost', 5)
+    listing_limit = config.get('local_match_listing_limit') or config.get('max_posts_per_subreddit', 50)
     time_filter = filters.get('time_filter', 'all')
+    oldest_allowed = time.time() - TIME_FILTER_SECONDS[time_filter] if time_filter in TIME_FILTER_SECONDS else 0
+    total_keywords = len(keyword_list)
+    total_subreddits = len(subreddit_list)
+    log_message("info", f"Local keyword matching: fetching each subreddit's newest {listing_limit} posts once and matching {total_keywords} keywords offline")
+    for subreddit_idx, subreddit_name in enumerate(subreddit_list):
+        if stop_requested:
+            log_message("info", "Scraping stopped by user")
+            break
+        current_iteration_posts = 0
+        cpu, ram = get_system_metrics()
+        elapsed = int(time.time() - start_time)
+        send_progress("running", f"r/{subreddit_name}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, 0, total_keywords, subreddit_idx, total_subreddits, current_iteration_posts, listing_limit, "keyword")
+        try:
+            rate_limiter.wait_if_needed()
+            subreddit = SubredditListings(reddit, subreddit_name)
+            posts_generator = handle_reddit_request(
+                lambda: list(subreddit.new(limit=listing_limit))
+            )
+            listing_requests += max(1, -(-listing_limit // 100))
+            if posts_generator is None:
+                log_message("error", f"Failed to retrieve posts from r/{subreddit_name}")
+                continue
+            posts = [post for post in posts_generator if post.created_utc >= oldest_allowed]
+            if len(posts) == 0:
+                log_empty_results(subreddit_name, mode="local match")
+                continue
+            title_index = TitleIndex(posts)
+            post_matches = {}
+            for keyword in keyword_list:
+                for post_idx in title_index.candidates(keyword, filters.get('strict_keyword_matching', False)):
+                    match_passes, match_info = check_keyword_match(
+                        posts[post_idx].title,
+                        keyword,
+                        filters.get('strict_keyword_matching', False),
+                        filters.get('count_entities_as_keywords', False),
+                        config.get('entity_recognition', False)
+                    )
+                    if match_passes:
+                        post_matches.setdefault(post_idx, []).append((keyword, match_info))
+            for post_idx, post in enumerate(posts):
+                if stop_requested:
+                    log_message("info", "Scraping stopped by user")
+                    return posts_collected
+                if auto_stop_target is not None and posts_collected >= auto_stop_target:
+                    log_message("info", f"Reached auto-stop target of {auto_stop_target} posts")
+                    return posts_collected
+                matches = post_matches.get(post_idx)
+                if not matches:
+                    log_message("rejected", 
+                        f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: No keyword matched",
+                        post.id, 
+                        "No keyword matched")
+                    continue
+                passes_filter, reason = apply_filters(post, filters)
+                if not passes_filter:
+                    log_message("rejected", 
+                        f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: {reason}",
+                        post.id, 
+                        reason)
+                    continue
+                keyword, match_info = matches[0]
+                matched_words = []
+                for _, other_match_info in matches:
+                    for word in other_match_info["matched_keywords"] or [keyword]:
+                        if word not in matched_words:
+                            matched_words.append(word)
+                if pipeline.submit(post, "keyword", keyword, match_info, ", ".join(matched_words)):
+                    current_iteration_posts += 1
+                    posts_collected += 1
+                    cpu, ram = get_system_metrics()
+                    elapsed = int(time.time() - start_time)
+                    send_progress("running", f"r/{subreddit_name}: {keyword}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, keyword_list.index(keyword), total_keywords, subreddit_idx, total_subreddits, current_iteration_posts, listing_limit, "keyword")
+        except Forbidden as e:
+            categorize_and_log_error(e, f"r/{subreddit_name}")
+            continue
+        except Exception as e:
+            categorize_and_log_error(e, f"r/{subreddit_name}")
+            continue
+        if current_iteration_posts > 0:
+            log_message("info", f"r/{subreddit_name} complete: {current_iteration_posts} posts matched {total_keywords} keywords locally")
+        cpu, ram = get_system_metrics()
+        elapsed = int(time.time() - start_time)
+        send_progress("running", f"Completed r/{subreddit_name}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, total_keywords, total_keywords, subreddit_idx + 1, total_subreddits, 0, 0, "keyword")
+    log_message("info", f"Local keyword matching used {listing_requests} listing requests instead of {total_keywords * total_subreddits} searches")
+    return posts_collected
+def scrape_deepscan_mode(reddit, subreddit_list, config, filters, start_time, pipeline, user_id, preset, rate_limiter):
+    global stop_requested
+    posts_collected = 0
+    auto_stop_target = config.get('auto_stop_target') or config.get('autoStopTarget')
+    max_posts_per_subreddit = config.get('max_posts_per_subreddit', 50)
     total_subreddits = len(subreddit_list)
     for subreddit_idx, subreddit_name in enumerate(subreddit_list):
         if stop_requested:
@@ -434,9 +1589,9 @@ def scrape_deepscan_mode(reddit, subreddit_list, config, filters, start_time, su
         send_progress("running", f"r/{subreddit_name}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, 0, 0, subreddit_idx, total_subreddits, current_iteration_posts, max_posts_per_subreddit, "deepscan")
         try:
             rate_limiter.wait_if_needed()
-            subreddit = reddit.subreddit(subreddit_name)
+            subreddit = SubredditListings(reddit, subreddit_name)
             posts_generator = handle_reddit_request(
-                lambda: list(subreddit.hot(limit=max_posts_per_subreddit))
+                lambda: fetch_listing_posts(subreddit, filters, config, max_posts_per_subreddit)
             )
             if posts_generator is None:
                 log_message("error", f"Failed to retrieve posts from r/{subreddit_name}")
@@ -458,56 +1613,12 @@ def scrape_deepscan_mode(reddit, subreddit_list, config, filters, start_time, su
                         post.id, 
                         reason)
                     continue
-                sentiment_score = 0.0
-                sentiment_label = "neutral"
-                if config.get('sentiment_analysis', True):
-                    sentiment_score, sentiment_label = analyze_sentiment(post.title + " " + (post.selftext or ""))
-                entities_data = []
-                if config.get('entity_recognition', False):
-                    entities_data = extract_entities(post.title + " " + (post.selftext or ""))
-                comments_data = []
-                if scrape_comments_enabled:
-                    comments_data = scrape_comments(post, max_comments, config.get('sentiment_analysis', True))
-                post_data = {
-                    "post_id": post.id,
-                    "title": post.title,
-                    "body": post.selftext or "",
-                    "author": str(post.author) if post.author else "[deleted]",
-                    "subreddit": post.subreddit.display_name,
-                    "url": post.url,
-                    "created_utc": datetime.fromtimestamp(post.created_utc).isoformat(),
-                    "score": post.score,
-                    "num_comments": post.num_comments,
-                    "upvote_ratio": post.upvote_ratio,
-                    "permalink": f"https://reddit.com{post.permalink}",
-                    "link_flair_text": post.link_flair_text or "",
-                    "over_18": post.over_18,
-                    "spoiler": post.spoiler,
-                    "stickied": post.stickied,
-                    "sentiment_score": sentiment_score,
-                    "sentiment_label": sentiment_label,
-                    "entities": entities_data,
-                    "comments": comments_data,
-                    "keywords_found": "",
-                    "collected_at": datetime.utcnow().isoformat() + 'Z',
-                    "search_mode": "deepscan",
-                    "batch_id": f"batch_{int(time.time())}",
-                    "preset_name": preset.get('name', 'Unknown'),
-                    "preset_id": preset.get('id', ''),
-                    "keyword_used": ""
-                }
-                try:
-                    supabase.table('reddit_posts').insert(post_data).execute()
-                    log_message("success", 
-                        f"✅ ACCEPTED: \"{post.title[:60]}...\"\n              - Score: {post.score} | Comments: {post.num_comments}",
-                        post.id)
+                if pipeline.submit(post, "deepscan"):
                     current_iteration_posts += 1
                     posts_collected += 1
                     cpu, ram = get_system_metrics()
                     elapsed = int(time.time() - start_time)
                     send_progress("running", f"r/{subreddit_name}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, 0, 0, subreddit_idx, total_subreddits, current_iteration_posts, max_posts_per_subreddit, "deepscan")
-                except Exception as e:
-                    categorize_and_log_error(e, f"Failed to save post '{post.title[:30]}...' to database")
         except Forbidden as e:
             categorize_and_log_error(e, f"r/{subreddit_name}")
             continue
@@ -520,7 +1631,17 @@ def scrape_deepscan_mode(reddit, subreddit_list, config, filters, start_time, su
         elapsed = int(time.time() - start_time)
         send_progress("running", f"Completed r/{subreddit_name}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, 0, 0, subreddit_idx + 1, total_subreddits, 0, 0, "deepscan")
     return posts_collected
-def scrape_hybrid_mode(reddit, subreddit_list, keywords, config, filters, start_time, supabase, user_id, preset, rate_limiter):
+def fetch_hybrid_source(subreddit, source, keyword, filters, config, limit):
+    if source == "search":
+        return fetch_search_posts(subreddit, keyword, filters, config, limit)
+    if source == "top":
+        plan = plan_listing_query(filters, config, "top")
+        listing = subreddit.top(time_filter=plan["time_filter"], limit=limit)
+        return take_until_below_threshold(listing, plan, config.get('early_stop_patience', 3))
+    if source == "new":
+        return list(subreddit.new(limit=limit))
+    return list(subreddit.hot(limit=limit))
+def scrape_hybrid_mode(reddit, subreddit_list, keywords, config, filters, start_time, pipeline, user_id, preset, rate_limiter):
     global stop_requested
     if isinstance(keywords, list):
         keyword_list = [k.strip() for k in keywords if k.strip()]
@@ -530,34 +1651,42 @@ def scrape_hybrid_mode(reddit, subreddit_list, keywords, config, filters, start_
     auto_stop_target = config.get('auto_stop_target') or config.get('autoStopTarget')
     max_posts_per_keyword = config.get('max_posts_per_keyword', 50)
     max_posts_per_subreddit = config.get('max_posts_per_subreddit', 50)
-    scrape_comments_enabled = config.get('scrape_comments') or config.get('scrapeComments', False)
-    max_comments = config.get('max_comments_per_post') or config.get('maxCommentsPerPost', 5)
-    time_filter = filters.get('time_filter', 'all')
+    listing_sources = [l for l in config.get('hybrid_listings', ['hot', 'new', 'top']) if l in ('hot', 'new', 'top')]
+    sources = [("search", keyword) for keyword in keyword_list] + [(listing, "") for listing in listing_sources]
+    source_stats = {}
+    for source, keyword in sources:
+        source_stats[f"search: {keyword}" if source == "search" else source] = {"requests": 0, "returned": 0, "new": 0, "accepted": 0}
+    seen_posts = {}
     total_keywords = len(keyword_list)
     total_subreddits = len(subreddit_list)
-    for keyword_idx, keyword in enumerate(keyword_list):
+    for subreddit_idx, subreddit_name in enumerate(subreddit_list):
         if stop_requested:
             log_message("info", "Scraping stopped by user")
             break
-        for subreddit_idx, subreddit_name in enumerate(subreddit_list):
+        subreddit = SubredditListings(reddit, subreddit_name)
+        for source_idx, (source, keyword) in enumerate(sources):
             if stop_requested:
                 log_message("info", "Scraping stopped by user")
                 break
+            stats = source_stats[f"search: {keyword}" if source == "search" else source]
+            target_label = f"r/{subreddit_name}: {keyword}" if source == "search" else f"r/{subreddit_name} ({source})"
+            limit = max_posts_per_keyword if source == "search" else max_posts_per_subreddit
             current_iteration_posts = 0
             cpu, ram = get_system_metrics()
             elapsed = int(time.time() - start_time)
-            send_progress("running", f"r/{subreddit_name}: {keyword}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, keyword_idx, total_keywords, subreddit_idx, total_subreddits, current_iteration_posts, max_posts_per_keyword, "hybrid")
+            send_progress("running", target_label, posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, min(source_idx, total_keywords), total_keywords, subreddit_idx, total_subreddits, current_iteration_posts, limit, "hybrid")
             try:
                 rate_limiter.wait_if_needed()
-                subreddit = reddit.subreddit(subreddit_name)
                 posts_generator = handle_reddit_request(
-                    lambda: list(subreddit.search(keyword, limit=max_posts_per_keyword, time_filter=time_filter))
+                    lambda: fetch_hybrid_source(subreddit, source, keyword, filters, config, limit)
                 )
                 if posts_generator is None:
                     log_message("error", f"Failed to retrieve posts from r/{subreddit_name}")
                     continue
+                stats["requests"] += max(1, -(-len(posts_generator) // 100))
+                stats["returned"] += len(posts_generator)
                 if len(posts_generator) == 0:
-                    log_empty_results(subreddit_name, keyword, mode="hybrid")
+                    log_empty_results(subreddit_name, keyword or None, mode=f"hybrid {source}")
                     continue
                 for post in posts_generator:
                     if stop_requested:
@@ -566,86 +1695,45 @@ def scrape_hybrid_mode(reddit, subreddit_list, keywords, config, filters, start_
                     if auto_stop_target is not None and posts_collected >= auto_stop_target:
                         log_message("info", f"Reached auto-stop target of {auto_stop_target} posts")
                         return posts_collected
-                    passes_filter, reason = apply_filters(post, filters)
-                    if not passes_filter:
-                        log_message("rejected", 
-                            f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: {reason}",
-                            post.id, 
-                            reason)
+                    status = seen_posts.get(post.id)
+                    if status in ("accepted", "filtered"):
                         continue
-                    match_passes, match_info = check_keyword_match(
-                        post.title,
-                        keyword,
-                        filters.get('strict_keyword_matching', False),
-                        filters.get('count_entities_as_keywords', False),
-                        config.get('entity_recognition', False)
-                    )
-                    if not match_passes:
-                        matched_str = ", ".join([f'"{k}"' for k in match_info["matched_keywords"]]) if match_info["matched_keywords"] else "none"
-                        missing_str = ", ".join([f'"{k}"' for k in match_info["missing_keywords"]]) if match_info["missing_keywords"] else "none"
-                        log_message("rejected", 
-                            f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: Keyword match failed ({match_info['matched_count']}/{match_info['total_required']} keywords found)\n              - Matched: {matched_str} | Missing: {missing_str}",
-                            post.id, 
-                            f"Keyword mismatch: {match_info['matched_count']}/{match_info['total_required']}")
-                        continue
-                    sentiment_score = 0.0
-                    sentiment_label = "neutral"
-                    if config.get('sentiment_analysis', True):
-                        sentiment_score, sentiment_label = analyze_sentiment(post.title + " " + (post.selftext or ""))
-                    entities_data = []
-                    if config.get('entity_recognition', False):
-                        entities_data = extract_entities(post.title + " " + (post.selftext or ""))
-                    comments_data = []
-                    if scrape_comments_enabled:
-                        comments_data = scrape_comments(post, max_comments, config.get('sentiment_analysis', True))
-                    keywords_found = ", ".join(match_info["matched_keywords"]) if match_info["matched_keywords"] else keyword
-                    post_data = {
-                        "post_id": post.id,
-                        "title": post.title,
-                        "body": post.selftext or "",
-                        "author": str(post.author) if post.author else "[deleted]",
-                        "subreddit": post.subreddit.display_name,
-                        "url": post.url,
-                        "created_utc": datetime.fromtimestamp(post.created_utc).isoformat(),
-                        "score": post.score,
-                        "num_comments": post.num_comments,
-                        "upvote_ratio": post.upvote_ratio,
-                        "permalink": f"https://reddit.com{post.permalink}",
-                        "link_flair_text": post.link_flair_text or "",
-                        "over_18": post.over_18,
-                        "spoiler": post.spoiler,
-                        "stickied": post.stickied,
-                        "sentiment_score": sentiment_score,
-                        "sentiment_label": sentiment_label,
-                        "entities": entities_data,
-                        "comments": comments_data,
-                        "keywords_found": keywords_found,
-                        "collected_at": datetime.utcnow().isoformat() + 'Z',
-                        "search_mode": "hybrid",
-                        "batch_id": f"batch_{int(time.time())}",
-                        "preset_name": preset.get('name', 'Unknown'),
-                        "preset_id": preset.get('id', ''),
-                        "keyword_used": keyword
-                    }
-                    try:
-                        supabase.table('reddit_posts').insert(post_data).execute()
-                        entity_info = ""
-                        if match_info.get("entity_merges"):
-                            merged_entities = []
-                            for merge in match_info["entity_merges"]:
-                                merged_entities.append(f"\"{merge['entity']}\" ({merge['label']})")
-                            entity_info = f"\n              - Entities merged: {', '.join(merged_entities)}"
-                        matched_kw_str = ", ".join([f'"{k}"' for k in match_info["matched_keywords"]])
-                        log_message("success", 
-                            f"✅ ACCEPTED: \"{post.title[:60]}...\"\n              - Matched {match_info['matched_count']}/{match_info['total_required']} keywords: {matched_kw_str}\n              - Score: {post.score} | Comments: {post.num_comments}{entity_info}",
-                            post.id)
+                    if status is None:
+                        stats["new"] += 1
+                        passes_filter, reason = apply_filters(post, filters)
+                        if not passes_filter:
+                            seen_posts[post.id] = "filtered"
+                            log_message("rejected", 
+                                f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: {reason}",
+                                post.id, 
+                                reason)
+                            continue
+                    match_info = None
+                    if source == "search":
+                        match_passes, match_info = check_keyword_match(
+                            post.title,
+                            keyword,
+                            filters.get('strict_keyword_matching', False),
+                            filters.get('count_entities_as_keywords', False),
+                            config.get('entity_recognition', False)
+                        )
+                        if not match_passes:
+                            seen_posts[post.id] = "unmatched"
+                            matched_str = ", ".join([f'"{k}"' for k in match_info["matched_keywords"]]) if match_info["matched_keywords"] else "none"
+                            missing_str = ", ".join([f'"{k}"' for k in match_info["missing_keywords"]]) if match_info["missing_keywords"] else "none"
+                            log_message("rejected", 
+                                f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: Keyword match failed ({match_info['matched_count']}/{match_info['total_required']} keywords found)\n              - Matched: {matched_str} | Missing: {missing_str}",
+                                post.id, 
+                                f"Keyword mismatch: {match_info['matched_count']}/{match_info['total_required']}")
+                            continue
+                    seen_posts[post.id] = "accepted"
+                    if pipeline.submit(post, "hybrid", keyword, match_info):
+                        stats["accepted"] += 1
                         current_iteration_posts += 1
                         posts_collected += 1
                         cpu, ram = get_system_metrics()
                         elapsed = int(time.time() - start_time)
-                        send_progress("running", f"r/{subreddit_name}: {keyword}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, keyword_idx, total_keywords, subreddit_idx, total_subreddits, current_iteration_posts, max_posts_per_keyword, "hybrid")
-                    except Exception as e:
-                        categorize_and_log_error(e, f"Failed to save post '{post.title[:30]}...' to database")
+                        send_progress("running", target_label, posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, min(source_idx, total_keywords), total_keywords, subreddit_idx, total_subreddits, current_iteration_posts, limit, "hybrid")
             except Forbidden as e:
                 categorize_and_log_error(e, f"r/{subreddit_name}")
                 continue
@@ -653,16 +1741,495 @@ def scrape_hybrid_mode(reddit, subreddit_list, keywords, config, filters, start_
                 categorize_and_log_error(e, f"r/{subreddit_name}")
                 continue
             if current_iteration_posts > 0:
-                log_message("info", f"r/{subreddit_name} + '{keyword}': {current_iteration_posts} posts collected")
+                log_message("info", f"{target_label}: {current_iteration_posts} posts collected")
+        cpu, ram = get_system_metrics()
+        elapsed = int(time.time() - start_time)
+        send_progress("running", f"Completed r/{subreddit_name}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, total_keywords, total_keywords, subreddit_idx + 1, total_subreddits, 0, 0, "hybrid")
+    for source_name, stats in source_stats.items():
+        per_request = stats["accepted"] / stats["requests"] if stats["requests"] else 0.0
+        log_message("info", f"Hybrid source {source_name}: {stats['requests']} requests, {stats['returned']} posts returned, {stats['new']} unique, {stats['accepted']} accepted ({per_request:.2f} accepted/request)")
+    write_message({"type": "source_stats", "data": source_stats})
+    return posts_collected
+class SubredditPoller:
+    def __init__(self, name, initial_interval, min_interval, max_interval, target_posts_per_poll):
+        self.name = name
+        self.interval = min(max(initial_interval, min_interval), max_interval)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_posts_per_poll = target_posts_per_poll
+        self.cursor = None
+        self.newest_created = 0
+        self.posts_per_second = None
+        self.last_poll_time = None
+        self.empty_polls = 0
+    def observe(self, posts, now):
+        if posts:
+            self.cursor = posts[0].fullname
+            self.newest_created = max(self.newest_created, max(post.created_utc for post in posts))
+            self.empty_polls = 0
+        else:
+            self.empty_polls += 1
+        if self.last_poll_time is None:
+            created = [post.created_utc for post in posts]
+            if len(created) >= 2 and max(created) > min(created):
+                self.posts_per_second = (len(created) - 1) / (max(created) - min(created))
+        else:
+            window = max(now - self.last_poll_time, 1.0)
+            observed_rate = len(posts) / window
+            if self.posts_per_second is None:
+                self.posts_per_second = observed_rate
+            else:
+                self.posts_per_second = 0.5 * observed_rate + 0.5 * self.posts_per_second
+        self.last_poll_time = now
+        if self.posts_per_second:
+            self.interval = self.target_posts_per_poll / self.posts_per_second
+        else:
+            self.interval = self.max_interval
+        self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+        return now + self.interval
+def fetch_new_since(reddit, poller, page_size, max_pages, rate_limiter):
+    subreddit = SubredditListings(reddit, poller.name)
+    if poller.cursor is None or poller.empty_polls >= 3:
+        rate_limiter.wait_if_needed()
+        posts = handle_reddit_request(lambda: list(subreddit.new(limit=page_size)))
+        if posts is None:
+            return None
+        return [post for post in posts if post.created_utc > poller.newest_created]
+    fresh_posts = []
+    cursor = poller.cursor
+    for _ in range(max_pages):
+        rate_limiter.wait_if_needed()
+        page = handle_reddit_request(lambda: list(subreddit.new(limit=page_size, before=cursor)))
+        if not page:
+            break
+        fresh_posts = page + fresh_posts
+        if len(page) < page_size:
+            break
+        cursor = page[0].fullname
+    return fresh_posts
+def scrape_daemon_mode(reddit, subreddit_list, keywords, mode, config, filters, start_time, pipeline, user_id, preset, rate_limiter):
+    global stop_requested
+    if isinstance(keywords, list):
+        keyword_list = [k.strip() for k in keywords if k.strip()]
+    else:
+        keyword_list = [k.strip() for k in str(keywords).split(',') if k.strip()]
+    if mode == 'deepscan':
+        keyword_list = []
+    posts_collected = 0
+    auto_stop_target = config.get('auto_stop_target') or config.get('autoStopTarget')
+    min_interval = config.get('daemon_min_interval', 60)
+    max_interval = config.get('daemon_max_interval', 3600)
+    initial_interval = config.get('cycleDelay') or config.get('cycle_delay', 300)
+    target_posts_per_poll = config.get('daemon_target_posts_per_poll', 10)
+    page_size = min(config.get('max_posts_per_subreddit', 50), 100)
+    max_pages = config.get('daemon_max_pages_per_poll', 10)
+    total_subreddits = len(subreddit_list)
+    pollers = {name: SubredditPoller(name, initial_interval, min_interval, max_interval, target_posts_per_poll) for name in subreddit_list}
+    schedule = [(start_time, idx, name) for idx, name in enumerate(subreddit_list)]
+    heapq.heapify(schedule)
+    log_message("info", f"Continuous mode: polling each subreddit every {min_interval}s-{max_interval}s based on its posting rate")
+    while schedule and not stop_requested:
+        if auto_stop_target is not None and posts_collected >= auto_stop_target:
+            log_message("info", f"Reached auto-stop target of {auto_stop_target} posts")
+            break
+        due_time, subreddit_idx, subreddit_name = schedule[0]
+        now = time.time()
+        if due_time > now:
+            pipeline.drain()
+            time.sleep(min(1.0, due_time - now))
+            continue
+        heapq.heappop(schedule)
+        poller = pollers[subreddit_name]
+        current_iteration_posts = 0
+        cpu, ram = get_system_metrics()
+        elapsed = int(time.time() - start_time)
+        send_progress("running", f"Polling r/{subreddit_name}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, 0, len(keyword_list), subreddit_idx, total_subreddits, current_iteration_posts, page_size, mode)
+        try:
+            new_posts = fetch_new_since(reddit, poller, page_size, max_pages, rate_limiter)
+        except Exception as e:
+            categorize_and_log_error(e, f"r/{subreddit_name}")
+            new_posts = None
+        if new_posts is None:
+            heapq.heappush(schedule, (time.time() + poller.interval, subreddit_idx, subreddit_name))
+            continue
+        next_poll = poller.observe(new_posts, time.time())
+        heapq.heappush(schedule, (next_poll, subreddit_idx, subreddit_name))
+        for post in reversed(new_posts):
+            if stop_requested:
+                break
+            if auto_stop_target is not None and posts_collected >= auto_stop_target:
+                break
+            passes_filter, reason = apply_filters(post, filters)
+            if not passes_filter:
+                log_message("rejected", 
+                    f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: {reason}",
+                    post.id, 
+                    reason)
+                continue
+            matched_keyword = None
+            match_info = None
+            for keyword in keyword_list:
+                match_passes, match_info = check_keyword_match(
+                    post.title,
+                    keyword,
+                    filters.get('strict_keyword_matching', False),
+                    filters.get('count_entities_as_keywords', False),
+                    config.get('entity_recognition', False)
+                )
+                if match_passes:
+                    matched_keyword = keyword
+                    break
+            if keyword_list and matched_keyword is None:
+                log_message("rejected", 
+                    f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: No keyword matched",
+                    post.id, 
+                    "No keyword matched")
+                continue
+            if pipeline.submit(post, mode, matched_keyword or "", match_info if matched_keyword else None):
+                current_iteration_posts += 1
+                posts_collected += 1
+        cpu, ram = get_system_metrics()
+        elapsed = int(time.time() - start_time)
+        rate_per_hour = (poller.posts_per_second or 0) * 3600
+        log_message("info", f"r/{subreddit_name}: {len(new_posts)} new, {current_iteration_posts} collected (~{rate_per_hour:.1f} posts/hour, next poll in {int(poller.interval)}s)")
+        send_progress("running", "Waiting for new posts", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, 0, len(keyword_list), subreddit_idx + 1, total_subreddits, 0, 0, mode)
+    return posts_collected
+def parse_backfill_time(value, default=None):
+    if value is None or value == '':
+        return default
+    if isinstance(value, (int, float)):
+        return int(value)
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+def is_window_covered(completed_windows, window_start, window_end):
+    position = window_start
+    for start, end in sorted(completed_windows):
+        if start > position:
+            break
+        position = max(position, end)
+        if position >= window_end:
+            return True
+    return position >= window_end
+def build_backfill_query(keyword, window_start, window_end):
+    time_clause = f"timestamp:{window_start}..{window_end - 1}"
+    if not keyword:
+        return time_clause
+    escaped_keyword = keyword.replace("\\", "\\\\").replace("'", "\\'")
+    return f"(and {time_clause} '{escaped_keyword}')"
+def is_within_window(posts, window_start, window_end):
+    return all(window_start <= post.created_utc < window_end for post in posts)
+def fetch_backfill_window(subreddit, keyword, window_start, window_end, window_cap, rate_limiter):
+    query = build_backfill_query(keyword, window_start, window_end)
+    rate_limiter.wait_if_needed()
+    listing = subreddit.search(query, sort='new', syntax='cloudsearch', limit=window_cap, keyword=keyword)
+    posts = []
+    estimated_total = None
+    for post in listing:
+        posts.append(post)
+        if len(posts) == 100:
+            if not is_within_window(posts, window_start, window_end):
+                return posts, None
+            covered_span = window_end - min(p.created_utc for p in posts)
+            if covered_span > 0:
+                estimated_total = int(100 * (window_end - window_start) / covered_span)
+                if estimated_total > window_cap:
+                    return posts, estimated_total
+        if len(posts) % 100 == 0:
+            rate_limiter.wait_if_needed()
+    if len(posts) < 100 and not is_within_window(posts, window_start, window_end):
+        return posts, None
+    if len(posts) >= window_cap:
+        return posts, max(estimated_total or 0, window_cap * 2)
+    return posts, len(posts)
+def split_backfill_window(window_start, window_end, estimated_total, window_cap, min_window):
+    pieces = max(2, -(-estimated_total // max(window_cap // 2, 1)))
+    piece_size = max(min_window, -(-(window_end - window_start) // pieces))
+    windows = []
+    start = window_start
+    while start < window_end:
+        windows.append((start, min(start + piece_size, window_end)))
+        start += piece_size
+    return windows
+def scrape_backfill_mode(reddit, subreddit_list, keywords, mode, config, filters, start_time, pipeline, user_id, preset, rate_limiter):
+    global stop_requested
+    if isinstance(keywords, list):
+        keyword_list = [k.strip() for k in keywords if k.strip()]
+    else:
+        keyword_list = [k.strip() for k in str(keywords).split(',') if k.strip()]
+    if mode == 'deepscan' or not keyword_list:
+        keyword_list = [""]
+    posts_collected = 0
+    auto_stop_target = config.get('auto_stop_target') or config.get('autoStopTarget')
+    try:
+        range_start = parse_backfill_time(config.get('backfill_start'))
+        range_end = parse_backfill_time(config.get('backfill_end'), int(time.time()))
+    except ValueError as e:
+        log_message("error", f"Invalid backfill date range: {str(e)}")
+        return 0
+    if range_start is None or range_start >= range_end:
+        log_message("error", "Backfill mode needs a backfill_start date earlier than backfill_end")
+        return 0
+    window_cap = min(config.get('backfill_window_cap', 1000), 1000)
+    min_window = config.get('backfill_min_window', 3600)
+    checkpoint_file = f"backfill_{preset.get('id') or 'default'}.json"
+    checkpoint = load_state_file(checkpoint_file, {})
+    work_items = [(subreddit_name, keyword) for keyword in keyword_list for subreddit_name in subreddit_list]
+    total_keywords = len([k for k in keyword_list if k])
+    total_subreddits = len(subreddit_list)
+    range_label = f"{datetime.fromtimestamp(range_start, tz=timezone.utc).date()} to {datetime.fromtimestamp(range_end, tz=timezone.utc).date()}"
+    log_message("info", f"Backfill mode: {range_label}, windows capped at {window_cap} posts")
+    for item_idx, (subreddit_name, keyword) in enumerate(work_items):
+        if stop_requested:
+            log_message("info", "Scraping stopped by user")
+            break
+        checkpoint_key = f"{subreddit_name.lower()}|{keyword.lower()}"
+        completed_windows = checkpoint.setdefault(checkpoint_key, [])
+        subreddit = SubredditListings(reddit, subreddit_name)
+        keyword_idx = keyword_list.index(keyword)
+        subreddit_idx = subreddit_list.index(subreddit_name)
+        current_iteration_posts = 0
+        pending_windows = [(range_start, range_end)]
+        while pending_windows:
+            if stop_requested:
+                break
+            if auto_stop_target is not None and posts_collected >= auto_stop_target:
+                log_message("info", f"Reached auto-stop target of {auto_stop_target} posts")
+                save_state_file(checkpoint_file, checkpoint)
+                return posts_collected
+            window_start, window_end = pending_windows.pop()
+            if is_window_covered(completed_windows, window_start, window_end):
+                continue
+            window_label = f"{datetime.fromtimestamp(window_start, tz=timezone.utc):%Y-%m-%d %H:%M} to {datetime.fromtimestamp(window_end, tz=timezone.utc):%Y-%m-%d %H:%M}"
+            target_label = f"r/{subreddit_name}: {keyword} [{window_label}]" if keyword else f"r/{subreddit_name} [{window_label}]"
             cpu, ram = get_system_metrics()
             elapsed = int(time.time() - start_time)
-            send_progress("running", f"Completed r/{subreddit_name}: {keyword}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, keyword_idx, total_keywords, subreddit_idx + 1, total_subreddits, 0, 0, "hybrid")
+            send_progress("running", target_label, posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, keyword_idx, total_keywords, subreddit_idx, total_subreddits, current_iteration_posts, window_cap, mode)
+            try:
+                result = handle_reddit_request(lambda: fetch_backfill_window(subreddit, keyword, window_start, window_end, window_cap, rate_limiter))
+            except Exception as e:
+                categorize_and_log_error(e, target_label)
+                break
+            if result is None:
+                log_message("error", f"Failed to retrieve posts for {target_label}")
+                break
+            posts, estimated_total = result
+            if estimated_total is None:
+                log_message("error", f"{target_label}: search returned posts outside the requested time window; skipping this backfill because Reddit ignored the timestamp filter")
+                break
+            if estimated_total > window_cap:
+                if window_end - window_start > min_window:
+                    sub_windows = split_backfill_window(window_start, window_end, estimated_total, window_cap, min_window)
+                    log_message("info", f"{target_label}: ~{estimated_total} posts exceeds the listing cap, splitting into {len(sub_windows)} windows")
+                    pending_windows.extend(sub_windows)
+                    continue
+                log_message("info", f"{target_label}: window is at the minimum size but still hits the listing cap; older posts in it may be missing")
+            in_window = [post for post in posts if window_start <= post.created_utc < window_end]
+            for post in reversed(in_window):
+                if stop_requested:
+                    break
+                if auto_stop_target is not None and posts_collected >= auto_stop_target:
+                    break
+                passes_filter, reason = apply_filters(post, filters)
+                if not passes_filter:
+                    log_message("rejected", 
+                        f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: {reason}",
+                        post.id, 
+                        reason)
+                    continue
+                match_info = None
+                if keyword:
+                    match_passes, match_info = check_keyword_match(
+                        post.title,
+                        keyword,
+                        filters.get('strict_keyword_matching', False),
+                        filters.get('count_entities_as_keywords', False),
+                        config.get('entity_recognition', False)
+                    )
+                    if not match_passes:
+                        log_message("rejected", 
+                            f"❌ REJECTED: \"{post.title[:60]}...\"\n              - Reason: Keyword match failed ({match_info['matched_count']}/{match_info['total_required']} keywords found)",
+                            post.id, 
+                            f"Keyword mismatch: {match_info['matched_count']}/{match_info['total_required']}")
+                        continue
+                if pipeline.submit(post, mode, keyword, match_info):
+                    current_iteration_posts += 1
+                    posts_collected += 1
+            if stop_requested or (auto_stop_target is not None and posts_collected >= auto_stop_target):
+                continue
+            completed_windows.append([window_start, window_end])
+            save_state_file(checkpoint_file, checkpoint)
+        if current_iteration_posts > 0 and keyword:
+            log_message("info", f"r/{subreddit_name} + '{keyword}': {current_iteration_posts} posts backfilled")
+        elif current_iteration_posts > 0:
+            log_message("info", f"r/{subreddit_name}: {current_iteration_posts} posts backfilled")
         cpu, ram = get_system_metrics()
         elapsed = int(time.time() - start_time)
-        send_progress("running", f"Completed keyword: {keyword}", posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, keyword_idx + 1, total_keywords, 0, total_subreddits, 0, 0, "hybrid")
+        send_progress("running", f"Completed r/{subreddit_name}" + (f": {keyword}" if keyword else ""), posts_collected, auto_stop_target or 5000, cpu, ram, elapsed, keyword_idx, total_keywords, subreddit_idx + 1, total_subreddits, 0, 0, mode)
+    save_state_file(checkpoint_file, checkpoint)
     return posts_collected
+def configure_request_ledger(config, reddit, supabase, preset, mode, run_id):
+    global api_ledger
+    api_ledger = None
+    if not config.get('request_ledger', True):
+        return None
+    ledger_dir = os.path.join(get_state_directory(), 'request_ledgers')
+    os.makedirs(ledger_dir, exist_ok=True)
+    existing = sorted(glob.glob(os.path.join(ledger_dir, '*.sqlite3')), key=os.path.getmtime)
+    for old_path in existing[:max(0, len(existing) - config.get('request_ledger_keep', 50) + 1)]:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+    path = os.path.join(ledger_dir, f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.sqlite3")
+    try:
+        api_ledger = RequestLedger(path, config.get('request_ledger_batch_size', 200), on_error=lambda message: log_message("error", message))
+        instrument_session(reddit._core._requestor._http, "reddit", api_ledger)
+        instrument_session(supabase.postgrest.session, "supabase", api_ledger)
+    except (sqlite3.Error, AttributeError) as e:
+        log_message("error", f"Request ledger unavailable: {str(e)}")
+        if api_ledger is not None:
+            api_ledger.close()
+        api_ledger = None
+        return None
+    api_ledger.set_meta(run_id=run_id, preset_id=preset.get('id'), preset_name=preset.get('name'), mode=mode, runtime_mode=config.get('runtime_mode', 'once'), started_at=time.time())
+    return api_ledger
+def close_request_ledger(posts_collected):
+    if api_ledger is None:
+        return None
+    api_ledger.set_meta(finished_at=time.time(), posts_collected=posts_collected)
+    api_ledger.close()
+    return dict(api_ledger.totals(), path=api_ledger.path)
+def describe_queues(pipeline):
+    queues = {"posts_saved": pipeline.posts_saved, "duplicates": pipeline.deduplicator.duplicates}
+    if pipeline.comment_stage is not None:
+        queues["comment_stage"] = {"pending": len(pipeline.comment_stage.pending), "max_pending": pipeline.comment_stage.max_pending}
+    if pipeline.cpu_stage is not None:
+        queues["cpu_stage"] = {"buffered": len(pipeline.cpu_stage.buffer), "pending_chunks": len(pipeline.cpu_stage.pending), "max_pending": pipeline.cpu_stage.max_pending, "spilling": pipeline.cpu_stage.spilling, "spilled": pipeline.cpu_stage.spilled}
+    if pipeline.governor is not None:
+        queues["governor"] = {"scale": pipeline.governor.scale, "peak_rss_mb": round(pipeline.governor.peak_rss_mb, 1)}
+    return queues
+def describe_rate_limits(rate_limiter, reddit):
+    now = time.time()
+    limits = {}
+    if rate_limiter is not None:
+        limits["scraper"] = {"requests_per_minute": rate_limiter.requests_per_minute, "next_slot_in": round(max(0.0, rate_limiter.last_request_time + rate_limiter.min_interval - now), 3)}
+    reddit_limiter = getattr(getattr(reddit, '_core', None), '_rate_limiter', None)
+    if reddit_limiter is not None:
+        limits["reddit"] = {
+            "remaining": reddit_limiter.remaining,
+            "used": reddit_limiter.used,
+            "reset_in": round(reddit_limiter.reset_timestamp - now, 1) if reddit_limiter.reset_timestamp else None,
+            "next_request_in": round(max(0.0, reddit_limiter.next_request_timestamp - now), 3) if reddit_limiter.next_request_timestamp else None
+        }
+    return limits
+def dump_diagnostics(sig, frame):
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = []
+    for thread_id, thread_frame in sys._current_frames().items():
+        stacks.append(f"Thread {names.get(thread_id, thread_id)}:\n" + "".join(traceback.format_stack(thread_frame)))
+    state = {"rate_limits": describe_rate_limits(active_rate_limiter, getattr(active_pipeline, 'reddit', None))}
+    if active_pipeline is not None:
+        state["queues"] = describe_queues(active_pipeline)
+    if stage_timer is not None:
+        state["stage_timings"] = stage_timer.summary()
+    log_message("info", f"Diagnostics dump ({len(stacks)} threads)\n" + "\n".join(stacks) + "\n" + json.dumps(state, indent=2))
+    write_message({"type": "diagnostics", "data": state})
+def write_memory_snapshot(sig, frame):
+    global previous_memory_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        log_message("info", "Memory tracing started - send the signal again to write an allocation snapshot")
+        return
+    snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+    current, peak = tracemalloc.get_traced_memory()
+    path = os.path.join(get_exports_directory(), f"memory_snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"Traced memory: {current / 1024 / 1024:.1f} MB current, {peak / 1024 / 1024:.1f} MB peak\n\nTop allocations by line:\n")
+            for stat in snapshot.statistics('lineno')[:25]:
+                f.write(f"{stat}\n")
+            if previous_memory_snapshot is not None:
+                f.write("\nGrowth since previous snapshot:\n")
+                for stat in snapshot.compare_to(previous_memory_snapshot, 'lineno')[:25]:
+                    f.write(f"{stat}\n")
+    except OSError as e:
+        log_message("error", f"Failed to write memory snapshot: {str(e)}")
+        return
+    previous_memory_snapshot = snapshot
+    log_message("info", f"Memory snapshot written to {path} ({current / 1024 / 1024:.1f} MB traced)")
+if hasattr(signal, 'SIGUSR1'):
+    signal.signal(signal.SIGUSR1, dump_diagnostics)
+    signal.signal(signal.SIGUSR2, write_memory_snapshot)
+class StackSampler:
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+    def start(self):
+        self.thread.start()
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+class RunProfiler:
+    def __init__(self, mode, interval_ms=5):
+        self.mode = mode
+        self.profile = cProfile.Profile() if mode == 'cprofile' else None
+        self.sampler = StackSampler(interval_ms / 1000.0)
+    def start(self):
+        self.sampler.start()
+        if self.profile is not None:
+            self.profile.enable()
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+        self.sampler.stop()
+        prefix = os.path.join(get_exports_directory(), f"scraper_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        result = {"mode": self.mode, "samples": self.sampler.samples, "collapsed": prefix + ".collapsed"}
+        self.sampler.write_collapsed(result["collapsed"])
+        if self.profile is not None:
+            result["stats"] = prefix + ".prof"
+            self.profile.dump_stats(result["stats"])
+        return result
+def profile_mode(config, argv):
+    mode = config.get('profile', False)
+    for index, arg in enumerate(argv):
+        if arg == '--profile':
+            mode = argv[index + 1] if index + 1 < len(argv) and not argv[index + 1].startswith('--') else 'cprofile'
+        elif arg.startswith('--profile='):
+            mode = arg.split('=', 1)[1]
+    if mode is True:
+        return 'cprofile'
+    if mode in ('cprofile', 'sampling'):
+        return mode
+    if mode:
+        log_message("error", f"Unknown profile mode '{mode}', profiling disabled")
+    return None
 def main():
-    global stop_requested
+    global stop_requested, active_pipeline, active_rate_limiter
     try:
         if len(sys.argv) < 2:
             log_message("error", "No configuration provided")
@@ -672,12 +2239,22 @@ def main():
         preset = data.get('preset', {})
         credentials = data.get('credentials', {})
         user_id = data.get('userId', '')
+        data_directories.update(data.get('directories') or {})
+        set_sentiment_threshold(config.get('sentiment_threshold', 0.1))
+        configure_analysis_cache(config)
+        configure_stage_timer(config)
         if config.get('entity_recognition', False):
             load_spacy_model()
+        reddit_endpoints = {}
+        if credentials.get('reddit_oauth_url'):
+            reddit_endpoints['oauth_url'] = credentials['reddit_oauth_url']
+        if credentials.get('reddit_url'):
+            reddit_endpoints['reddit_url'] = credentials['reddit_url']
         reddit = praw.Reddit(
             client_id=credentials['client_id'],
             client_secret=credentials['client_secret'],
-            user_agent=credentials['user_agent']
+            user_agent=credentials['user_agent'],
+            **reddit_endpoints
         )
         supabase: Client = create_client(
             credentials['supabase_url'],
@@ -685,8 +2262,10 @@ def main():
         )
         rate_limit = config.get('rateLimit') or config.get('rate_limit', 60)
         rate_limiter = RateLimiter(rate_limit)
+        active_rate_limiter = rate_limiter
         log_message("info", f"Rate limit: {rate_limit} requests/minute")
         mode = preset.get('mode', 'keyword')
+        run_id = str(uuid.uuid4())
         subreddits = preset.get('subreddits', '')
         if isinstance(subreddits, list):
             subreddit_list = [s.strip() for s in subreddits if s.strip()]
@@ -700,6 +2279,8 @@ def main():
         log_message("info", f"Subreddits: {', '.join(subreddit_list)}")
         if keywords:
             log_message("info", f"Keywords: {keywords}")
+            if filters.get('count_entities_as_keywords', False) and config.get('entity_recognition', False):
+                configure_keyword_phrase_matcher(config, keywords)
         auto_stop = config.get('auto_stop_target') or config.get('autoStopTarget')
         scrape_comments = config.get('scrape_comments') or config.get('scrapeComments', False)
         max_comments = config.get('max_comments_per_post') or config.get('maxCommentsPerPost', 5)
@@ -707,14 +2288,48 @@ def main():
             log_message("info", f"Auto-stop enabled: will stop at {auto_stop} posts")
         if scrape_comments:
             log_message("info", f"Comment scraping enabled: {max_comments} comments per post")
+        if config.get('enrichment_mode') == 'deferred':
+            log_message("info", "Deferred enrichment: posts are stored raw and marked pending for the enrichment worker")
         start_time = time.time()
         posts_collected = 0
-        if mode == 'keyword':
-            posts_collected = scrape_keyword_mode(reddit, subreddit_list, keywords, config, filters, start_time, supabase, user_id, preset, rate_limiter)
+        pipeline = PostPipeline(config, preset, supabase, rate_limiter, reddit)
+        active_pipeline = pipeline
+        configure_request_ledger(config, reddit, supabase, preset, mode, run_id)
+        profiler = None
+        mode_name = profile_mode(config, sys.argv[2:])
+        if mode_name:
+            profiler = RunProfiler(mode_name, config.get('profile_interval_ms', 5))
+            profiler.start()
+            log_message("info", f"Profiling this run ({mode_name})")
+        runtime_mode = config.get('runtime_mode', 'once')
+        if runtime_mode == 'backfill':
+            posts_collected = scrape_backfill_mode(reddit, subreddit_list, keywords, mode, config, filters, start_time, pipeline, user_id, preset, rate_limiter)
+        elif runtime_mode in ('continuous', 'infinite'):
+            posts_collected = scrape_daemon_mode(reddit, subreddit_list, keywords, mode, config, filters, start_time, pipeline, user_id, preset, rate_limiter)
+        elif mode == 'keyword' and config.get('keyword_strategy') == 'local':
+            posts_collected = scrape_local_match_mode(reddit, subreddit_list, keywords, config, filters, start_time, pipeline, user_id, preset, rate_limiter)
+        elif mode == 'keyword':
+            posts_collected = scrape_keyword_mode(reddit, subreddit_list, keywords, config, filters, start_time, pipeline, user_id, preset, rate_limiter)
         elif mode == 'deepscan':
-            posts_collected = scrape_deepscan_mode(reddit, subreddit_list, config, filters, start_time, supabase, user_id, preset, rate_limiter)
+            posts_collected = scrape_deepscan_mode(reddit, subreddit_list, config, filters, start_time, pipeline, user_id, preset, rate_limiter)
         elif mode == 'hybrid':
-            posts_collected = scrape_hybrid_mode(reddit, subreddit_list, keywords, config, filters, start_time, supabase, user_id, preset, rate_limiter)
+            posts_collected = scrape_hybrid_mode(reddit, subreddit_list, keywords, config, filters, start_time, pipeline, user_id, preset, rate_limiter)
+        pipeline.close()
+        posts_collected = pipeline.posts_saved
+        cache_stats = analysis_cache.stats() if analysis_cache is not None else None
+        stage_timings = stage_timer.summary() if stage_timer is not None else None
+        profile_info = None
+        if profiler is not None:
+            try:
+                profile_info = profiler.stop()
+                log_message("info", f"Profile written to {profile_info.get('stats') or profile_info['collapsed']}")
+            except OSError as e:
+                log_message("error", f"Failed to write profile: {str(e)}")
+        if stage_timings:
+            log_message("info", "Stage timings: " + ", ".join(f"{stage} {timing['total_ms'] / 1000:.1f}s" for stage, timing in list(stage_timings.items())[:5]))
+        if analysis_cache is not None:
+            analysis_cache.close()
+            log_message("info", f"Analysis cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits ({cache_stats['disk_hits']} from disk), {cache_stats['misses']} misses, {cache_stats['evictions']} evictions")
         elapsed = int(time.time() - start_time)
         cpu, ram = get_system_metrics()
         send_progress("completed", "Scraping completed", posts_collected, posts_collected, cpu, ram, elapsed, 0, 0, 0, 0, 0, 0, mode)
@@ -727,15 +2342,21 @@ def main():
             keyword_preview = keywords[:30] if len(keywords) > 30 else keywords
             activity_text += f" with keywords '{keyword_preview}...'" if len(keywords) > 30 else f" with keywords '{keywords}'"
         add_recent_activity(supabase, user_id, activity_text)
+        ledger_info = close_request_ledger(posts_collected)
+        if ledger_info is not None:
+            log_message("info", f"Request ledger: {ledger_info['requests']} requests ({ledger_info['rate_limited']} rate limited) recorded in {ledger_info['path']}")
+        if config.get('run_summary', True):
+            write_run_summary(supabase, build_run_summary(run_id, user_id, preset, mode, config, pipeline, start_time, stage_timings, ledger_info, "stopped" if stop_requested else "complete"))
         if stop_requested:
             log_message("info", f"Scraping stopped by user: {posts_collected} posts collected in {elapsed}s")
-            print(json.dumps({"type": "stopped", "data": {"total_posts": posts_collected, "elapsed_time": elapsed}}), flush=True)
+            write_message({"type": "stopped", "data": {"total_posts": posts_collected, "elapsed_time": elapsed, "run_id": run_id, "stage_timings": stage_timings, "profile": profile_info, "request_ledger": ledger_info}})
         else:
             log_message("info", f"Scraping completed: {posts_collected} posts collected in {elapsed}s")
-            print(json.dumps({"type": "complete", "data": {"total_posts": posts_collected, "elapsed_time": elapsed}}), flush=True)
+            write_message({"type": "complete", "data": {"total_posts": posts_collected, "elapsed_time": elapsed, "run_id": run_id, "duplicates": pipeline.deduplicator.duplicates, "near_duplicates": pipeline.near_duplicates, "analysis_cache": cache_stats, "stage_timings": stage_timings, "profile": profile_info, "request_ledger": ledger_info}})
     except Exception as e:
         log_message("error", f"Fatal error: {str(e)}")
-        print(json.dumps({"type": "error", "data": {"message": str(e)}}), flush=True)
+        close_request_ledger(None)
+        write_message({"type": "error", "data": {"message": str(e)}})
         sys.exit(1)
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,145 @@
+import string
+CALIBRATION_TEXTS = [
+    "",
+    "lol",
+    "This.",
+    "This is a good movie",
+    "This is not a good movie",
+    "not really good",
+    "really not good",
+    "very very good!",
+    "It's not bad at all :)",
+    "Absolutely amazing!!! Best purchase ever",
+    "I don't love it, but it's fine I guess",
+    "The worst. Ever. :-(",
+    "Sure, that went great (!)",
+    "I am NOT happy with this terrible, horrible service!!!",
+    "kind of ok, sort of meh",
+    "never been better <3",
+    "extremely bad ;) but the price is right",
+    "Stocks went up 5% today, pretty solid earnings",
+    "No. Just no.",
+    "Wow, that is incredibly, unbelievably stupid",
+    "I love it 😀 it's great",
+    "Thanks!! This helped a lot.\n\nEdit: never mind, still broken",
+]
+class SentimentEngine:
+    def __init__(self, backend="textblob", analyzer=None):
+        self.backend = backend
+        if backend == "vader":
+            if analyzer is None:
+                from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+                analyzer = SentimentIntensityAnalyzer()
+            self.analyzer = analyzer
+            self.lexicon = self.analyzer.lexicon
+            self.fast_path = not any(emoji.isascii() for emoji in self.analyzer.emojis)
+        else:
+            from textblob import _text
+            from textblob.en import sentiment
+            self.reference = sentiment
+            self.tokenizer = sentiment.tokenizer
+            self.negations = set(sentiment.negations)
+            self.modifier = sentiment.modifier
+            self.punctuation = _text.PUNCTUATION
+            len(sentiment)
+            self.lexicon = {}
+            self.modifiers = set()
+            for word, tags in dict.items(sentiment):
+                polarity, subjectivity, intensity = tags[None]
+                self.lexicon[word] = (polarity, intensity)
+                if any(modifier in tags for modifier in sentiment.modifiers):
+                    self.modifiers.add(word)
+            self.emoticons = {}
+            for (mood, polarity), faces in _text.EMOTICONS.items():
+                for face in faces:
+                    self.emoticons.setdefault(face.lower(), polarity)
+            self.fast_path = True
+        self.fast_path = self.fast_path and self.verify(CALIBRATION_TEXTS) == 0
+    def reference_polarity(self, text):
+        if self.backend == "vader":
+            return self.analyzer.polarity_scores(text)["compound"]
+        return self.reference(text)[0]
+    def has_lexicon_token(self, text):
+        for token in text.split():
+            token = token.lower()
+            if token in self.lexicon or token.strip(string.punctuation) in self.lexicon:
+                return True
+        return False
+    def vader_polarity(self, text):
+        if text.isascii() and not self.has_lexicon_token(text):
+            return 0.0
+        return self.analyzer.polarity_scores(text)["compound"]
+    def textblob_polarity(self, text):
+        assessments = []
+        modifier = None
+        negation = None
+        for word in " ".join(self.tokenizer(text)).split():
+            word = word.lower()
+            entry = self.lexicon.get(word)
+            if entry is not None:
+                polarity, intensity = entry
+                if modifier is None:
+                    assessments.append([polarity, intensity, 1])
+                else:
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(polarity * last[1], +1.0))
+                    last[1] = intensity
+                if negation is not None:
+                    last = assessments[-1]
+                    last[1] = 1.0 / last[1]
+                    last[2] = -1
+                modifier = word if word in self.modifiers else None
+                negation = word if word in self.negations else None
+                continue
+            if word in self.negations:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                negation = None
+            if negation is not None and modifier is not None and self.modifier(modifier):
+                assessments[-1][2] = -1
+                negation = None
+            elif modifier and len(word) > 2:
+                modifier = None
+            if word == "!" and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, +1.0))
+            if word == "(!)":
+                assessments.append([0.0, 1.0, 1])
+            if word.isalpha() is False and len(word) <= 5 and word not in self.punctuation:
+                polarity = self.emoticons.get(word)
+                if polarity is not None:
+                    assessments.append([polarity, 1.0, 1])
+        total = 0
+        for polarity, intensity, negated in assessments:
+            total += polarity * -0.5 if negated < 0 else polarity
+        return total / float(len(assessments) or 1)
+    def score(self, text):
+        if not self.fast_path:
+            return self.reference_polarity(text)
+        try:
+            if self.backend == "vader":
+                return self.vader_polarity(text)
+            return self.textblob_polarity(text)
+        except Exception:
+            return self.reference_polarity(text)
+    def score_batch(self, texts):
+        scores = {}
+        results = []
+        for text in texts:
+            if text not in scores:
+                scores[text] = self.score(text)
+            results.append(scores[text])
+        return results
+    def verify(self, texts):
+        mismatches = 0
+        for text in texts:
+            try:
+                expected = self.reference_polarity(text)
+            except Exception:
+                continue
+            try:
+                actual = self.vader_polarity(text) if self.backend == "vader" else self.textblob_polarity(text)
+            except Exception:
+                actual = None
+            if actual != expected:
+                mismatches += 1
+        return mismatches
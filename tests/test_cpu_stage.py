@@ -0,0 +1,65 @@
+import os
+import signal
+import time
+import sys
+import pytest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+import scraper
+pytestmark = pytest.mark.skipif(not scraper.can_fork_workers(), reason="CPU stage needs the fork start method")
+def build_rows(count):
+    return [{'post_id': f'p{index}', 'title': f'Post {index} is great news', 'body': 'I love this release' if index % 2 else 'This bug is terrible', 'comments': [{'body': f'comment {index}'}]} for index in range(count)]
+def run_pool(rows):
+    saved = []
+    stage = scraper.CpuStage(2, 4, True, False, lambda row, match_info, dedup_key: saved.append(row))
+    try:
+        for row in rows:
+            stage.submit(row, None, row['post_id'])
+        stage.flush()
+    finally:
+        stage.shutdown()
+    return saved
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setitem(scraper.data_directories, 'base', str(tmp_path))
+    monkeypatch.setattr(scraper, 'analysis_cache', None)
+    yield lambda: scraper.configure_analysis_cache({'analysis_cache_disk': True})
+    if scraper.analysis_cache is not None:
+        scraper.analysis_cache.close()
+def test_pool_fills_and_reads_disk_cache(disk_cache):
+    rows = build_rows(12)
+    cache = disk_cache()
+    first = run_pool([dict(row, comments=[dict(c) for c in row['comments']]) for row in rows])
+    assert len(first) == 12
+    assert all('sentiment_label' in row for row in first)
+    assert cache.stats()['misses'] == 24
+    assert cache.stats()['entries'] == 24
+    cache.close()
+    cache = disk_cache()
+    second = run_pool([dict(row, comments=[dict(c) for c in row['comments']]) for row in rows])
+    assert cache.stats()['disk_hits'] == 24
+    assert cache.stats()['misses'] == 0
+    by_id = {row['post_id']: row for row in first}
+    for row in second:
+        assert row['sentiment_score'] == by_id[row['post_id']]['sentiment_score']
+        assert row['comments'][0]['sentiment_label'] == by_id[row['post_id']]['comments'][0]['sentiment_label']
+def test_pool_falls_back_in_process_when_a_worker_dies(monkeypatch):
+    monkeypatch.setattr(scraper, 'analysis_cache', None)
+    saved = []
+    stage = scraper.CpuStage(2, 4, True, False, lambda row, match_info, dedup_key: saved.append(row))
+    try:
+        rows = build_rows(12)
+        for row in rows[:4]:
+            stage.submit(row, None, row['post_id'])
+        stage.flush()
+        victim = next(iter(stage.executor._processes.values()))
+        os.kill(victim.pid, signal.SIGKILL)
+        victim.join()
+        time.sleep(0.5)
+        for row in rows[4:]:
+            stage.submit(row, None, row['post_id'])
+        stage.flush()
+    finally:
+        stage.shutdown()
+    assert stage.executor is None
+    assert sorted(row['post_id'] for row in saved) == sorted(row['post_id'] for row in rows)
+    assert all('sentiment_label' in row for row in saved)
@@ -0,0 +1,10 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import run_benchmarks
+def test_report_includes_scraper_errors():
+    args = run_benchmarks.parse_args(['--posts-per-subreddit', '10', '--latency-ms', '0', '--jitter-ms', '0', '--error-rate', '1', '--no-enrichment', '--timeout', '120'])
+    result = run_benchmarks.run_mode('deepscan', args, 1700000000)
+    assert result['status'] == 'complete'
+    assert result['errors']
+    assert all(error.get('message') for error in result['errors'])